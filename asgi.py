@@ -0,0 +1,14 @@
+# asgi.py - Production ASGI entry point
+#
+# Run with:  python asgi.py
+# or:        uvicorn asgi:app --workers 4
+#
+# Worker processes, thread pools and the drain timeout are configured with SERVER_WORKERS,
+# SERVER_THREADS, SERVER_WORK_THREADS and SERVER_DRAIN_TIMEOUT (see modules/asgi_server.py).
+from main import app as flask_app
+from modules.asgi_server import AsgiServer, serve, shutdown_managers
+
+app = AsgiServer(flask_app, on_shutdown=shutdown_managers)
+
+if __name__ == '__main__':
+    serve("asgi:app")
@@ -1,10 +1,22 @@
 import os
+import ast
+import json
+import time
+import hashlib
+import argparse
 import inspect
 import yaml
 import importlib.util
+from concurrent.futures import ProcessPoolExecutor
 
-MODULES_DIR = "modules/dspy"
-OUTPUT_YAML_PATH = r"C:\MWW\mw-Github\mw-context-api\dspy_modules.yaml"
+MODULES_DIR = os.getenv("DSPY_MODULES_DIR", "modules/dspy")
+OUTPUT_YAML_PATH = os.getenv("DSPY_YAML_OUTPUT", os.getenv("YAML_PATH", "dspy_modules.yaml"))
+CACHE_PATH = os.getenv("DSPY_YAML_CACHE", ".dspy_yaml_cache.json")
+DISCOVERY_WORKERS = int(os.getenv("DSPY_YAML_WORKERS", str(os.cpu_count() or 4)))
+PARALLEL_THRESHOLD = 64  # Below this many changed files a process pool costs more than it saves
+CACHE_VERSION = 2  # Bump when cached entries change shape or meaning
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+PRESERVED_KEYS = ("cache",)  # Hand-edited entry settings carried over when the YAML is regenerated
 
 def get_module_info(module_path, module_name):
     """Extract information about a module including name, import path, functions, and description."""
@@ -12,13 +24,13 @@ def get_module_info(module_path, module_name):
         spec = importlib.util.spec_from_file_location(module_name, module_path)
         module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(module)
-        
+
         # Get module docstring if available
         description = inspect.getdoc(module) if module.__doc__ else "No description available."
-        
+
         # Get functions from the module, filtering out duplicates to avoid redundancy
         functions = list(set(func for func, obj in inspect.getmembers(module, inspect.isfunction)))
-        
+
         return {
             "name": module_name,
             "import_path": f"modules.dspy.{module_name}",
@@ -29,24 +41,174 @@ def get_module_info(module_path, module_name):
         print(f"Failed to import {module_name}: {e}")
         return None
 
-def generate_yaml_for_dspy_modules():
+def import_root_for(module_path):
+    """Directory that import paths are relative to: the repo root, or else the top of the file's package."""
+    module_path = os.path.abspath(module_path)
+    if module_path.startswith(REPO_ROOT + os.sep):
+        return REPO_ROOT
+    directory = os.path.dirname(module_path)
+    while os.path.isfile(os.path.join(directory, "__init__.py")):
+        directory = os.path.dirname(directory)
+    return directory
+
+def import_path_for(module_path):
+    """Dotted import path for a module file, e.g. modules.dspy.teleprompt.bootstrap, whatever the working directory."""
+    relative = os.path.splitext(os.path.relpath(os.path.abspath(module_path), import_root_for(module_path)))[0]
+    parts = relative.split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+def _signature(node):
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+def parse_module_source(module_path):
+    """Extract module information from source with ast, without importing or executing it."""
+    with open(module_path, "rb") as f:
+        source = f.read()
+    import_path = import_path_for(module_path)
+    module_name = import_path.rsplit(".", 1)[-1]  # A package's __init__ is listed under the package name
+    try:
+        tree = ast.parse(source, filename=module_path)
+    except (SyntaxError, ValueError) as e:
+        print(f"Failed to parse {module_path}: {e}")
+        return None
+
+    details = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            details.append({
+                "name": node.name,
+                "signature": _signature(node),
+                "docstring": ast.get_docstring(node) or "",
+            })
+
+    return {
+        "name": module_name,
+        "import_path": import_path,
+        "description": ast.get_docstring(tree) or "No description available.",
+        "functions": sorted({detail["name"] for detail in details}),
+        "function_details": details,
+    }
+
+def _parse_with_hash(module_path):
+    with open(module_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return module_path, digest, parse_module_source(module_path)
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return cache.get("files", {}) if cache.get("version") == CACHE_VERSION else {}
+
+def save_cache(cache_path, cache):
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": CACHE_VERSION, "files": cache}, f)
+    os.replace(tmp_path, cache_path)
+
+def discover_modules(modules_dir=MODULES_DIR, cache_path=CACHE_PATH, workers=DISCOVERY_WORKERS):
+    """Parse every Python file under modules_dir, reusing cached results for files that did not change.
+
+    A file is re-read when its mtime or size differs from the cache; if its sha256 still
+    matches, the cached entry is kept. Changed files are parsed in a process pool.
+    Returns (modules_info, stats).
+    """
+    cache = load_cache(cache_path) if cache_path else {}
+    new_cache = {}
+    stale = []
+
+    for root, dirs, files in os.walk(modules_dir):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__" and not d.startswith("."))
+        for file in sorted(files):
+            if not file.endswith(".py"):
+                continue
+            module_path = os.path.abspath(os.path.join(root, file))  # Cache keys must not depend on the cwd
+            st = os.stat(module_path)
+            cached = cache.get(module_path)
+            if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+                new_cache[module_path] = cached
+            else:
+                new_cache[module_path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+                stale.append(module_path)
+
+    if len(stale) >= PARALLEL_THRESHOLD and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(_parse_with_hash, stale, chunksize=16))
+    else:
+        parsed = [_parse_with_hash(path) for path in stale]
+
+    reparsed = 0
+    for module_path, digest, info in parsed:
+        cached = cache.get(module_path)
+        if cached and cached.get("sha256") == digest:
+            info = cached["info"]  # Touched but unchanged
+        else:
+            reparsed += 1
+        new_cache[module_path].update({"sha256": digest, "info": info})
+
+    if cache_path:
+        save_cache(cache_path, new_cache)
+
+    modules_info = [entry["info"] for entry in new_cache.values() if entry["info"]]
+    stats = {"files": len(new_cache), "checked": len(stale), "reparsed": reparsed}
+    return modules_info, stats
+
+def preserved_settings(output_path):
+    """Per-module settings from an existing YAML file that regeneration should keep, keyed by name."""
+    try:
+        with open(output_path, "r") as yaml_file:
+            existing = yaml.safe_load(yaml_file) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+    settings = {}
+    for entry in existing.get("dspy_modules") or []:
+        kept = {key: entry[key] for key in PRESERVED_KEYS if key in entry}
+        if kept and entry.get("name"):
+            settings[entry["name"]] = kept
+    return settings
+
+def generate_yaml_for_dspy_modules(mode="ast", modules_dir=MODULES_DIR, output_path=OUTPUT_YAML_PATH,
+                                   cache_path=CACHE_PATH, workers=DISCOVERY_WORKERS):
+    started = time.perf_counter()
     modules_info = []
 
-    # Walk through the MODULES_DIR and get all Python files
-    for root, _, files in os.walk(MODULES_DIR):
-        for file in files:
-            if file.endswith(".py"):
-                module_path = os.path.join(root, file)
-                module_name = os.path.splitext(file)[0]
-                module_info = get_module_info(module_path, module_name)
-                if module_info:
-                    modules_info.append(module_info)
+    if mode == "import":
+        # Walk through the modules_dir and import all Python files
+        for root, _, files in os.walk(modules_dir):
+            for file in files:
+                if file.endswith(".py"):
+                    module_path = os.path.join(root, file)
+                    module_name = os.path.splitext(file)[0]
+                    module_info = get_module_info(module_path, module_name)
+                    if module_info:
+                        modules_info.append(module_info)
+    else:
+        modules_info, stats = discover_modules(modules_dir, cache_path, workers)
+        print(f"Scanned {stats['files']} files, re-checked {stats['checked']}, re-parsed {stats['reparsed']}.")
+
+    settings = preserved_settings(output_path)
+    modules_info = [{**info, **settings.get(info["name"], {})} for info in modules_info]
 
     # Write the gathered information into the YAML file
-    with open(OUTPUT_YAML_PATH, "w") as yaml_file:
-        yaml.dump({"dspy_modules": modules_info}, yaml_file, default_flow_style=False)
+    with open(output_path, "w") as yaml_file:
+        dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+        yaml.dump({"dspy_modules": modules_info}, yaml_file, Dumper=dumper, default_flow_style=False, sort_keys=False)
 
-    print(f"YAML file generated at: {OUTPUT_YAML_PATH}")
+    print(f"YAML file generated at: {output_path} ({len(modules_info)} modules in {time.perf_counter() - started:.2f}s)")
 
 if __name__ == "__main__":
-    generate_yaml_for_dspy_modules()
+    parser = argparse.ArgumentParser(description="Generate the DSPy module catalog YAML.")
+    parser.add_argument("--mode", choices=("ast", "import"), default="ast",
+                        help="ast parses source without executing it; import loads each module (slow, has side effects).")
+    parser.add_argument("--modules-dir", default=MODULES_DIR)
+    parser.add_argument("--output", default=OUTPUT_YAML_PATH)
+    parser.add_argument("--cache", default=CACHE_PATH, help="Parse cache file; pass an empty string to disable.")
+    parser.add_argument("--workers", type=int, default=DISCOVERY_WORKERS)
+    args = parser.parse_args()
+    generate_yaml_for_dspy_modules(args.mode, args.modules_dir, args.output, args.cache, args.workers)
@@ -1,26 +1,63 @@
 # main.py - Flask Web Version
+from modules import startup  # Imported first so its clock starts at process start
 from flask import Flask, render_template
-from modules.api_endpoints import docker_manage, add_knowledge, list_modules, execute_function, get_functions
-from modules.container_manager import ContainerManager
-from modules.dspy_manager import DSPyManager
+from modules.api_endpoints import (
+    docker_manage, add_knowledge, list_modules, execute_function, get_functions, execute_batch,
+    job_status, job_result, cancel_job, job_queue, cache_stats, clear_cache,
+    add_knowledge_batch, knowledge_writer_status, flush_knowledge, query_context, search_qa,
+    start_evaluation, evaluation_status, evaluation_events, stop_evaluation, lm_stats, startup_status,
+    reload_modules, reload_status, metrics_endpoint, list_profiles, profile_details, profile_collapsed, profile_pstats,
+    container_manager, dspy_manager, module_reloader
+)
+from modules.metrics import instrument_flask
+from modules.hot_reload import HOT_RELOAD
 
 app = Flask(__name__)
+instrument_flask(app)
 
 # Register API routes using imported functions from api_endpoints
 app.add_url_rule('/docker_manage', view_func=docker_manage, methods=['POST'])
 app.add_url_rule('/add_knowledge', view_func=add_knowledge, methods=['POST'])
+app.add_url_rule('/add_knowledge_batch', view_func=add_knowledge_batch, methods=['POST'])
+app.add_url_rule('/knowledge_writer/status', view_func=knowledge_writer_status, methods=['GET'])
+app.add_url_rule('/knowledge_writer/flush', view_func=flush_knowledge, methods=['POST'])
 app.add_url_rule('/list_modules', view_func=list_modules, methods=['GET'])
 app.add_url_rule('/execute_function', view_func=execute_function, methods=['POST'])
+app.add_url_rule('/execute_batch', view_func=execute_batch, methods=['POST'])
+app.add_url_rule('/query_context', view_func=query_context, methods=['POST'])
+app.add_url_rule('/search_qa', view_func=search_qa, methods=['POST'])
 app.add_url_rule('/get_functions', view_func=get_functions, methods=['GET'])
+app.add_url_rule('/jobs', view_func=job_queue, methods=['GET'])
+app.add_url_rule('/jobs/<job_id>', view_func=job_status, methods=['GET'])
+app.add_url_rule('/jobs/<job_id>/result', view_func=job_result, methods=['GET'])
+app.add_url_rule('/jobs/<job_id>/cancel', view_func=cancel_job, methods=['POST'])
+app.add_url_rule('/evaluations', view_func=start_evaluation, methods=['POST'])
+app.add_url_rule('/evaluations/<run_id>', view_func=evaluation_status, methods=['GET'])
+app.add_url_rule('/evaluations/<run_id>/events', view_func=evaluation_events, methods=['GET'])
+app.add_url_rule('/evaluations/<run_id>/stop', view_func=stop_evaluation, methods=['POST'])
+app.add_url_rule('/cache/stats', view_func=cache_stats, methods=['GET'])
+app.add_url_rule('/cache/clear', view_func=clear_cache, methods=['POST'])
+app.add_url_rule('/lm/stats', view_func=lm_stats, methods=['GET'])
+app.add_url_rule('/startup', view_func=startup_status, methods=['GET'])
+app.add_url_rule('/reload', view_func=reload_modules, methods=['POST'])
+app.add_url_rule('/reload/status', view_func=reload_status, methods=['GET'])
+app.add_url_rule('/metrics', view_func=metrics_endpoint, methods=['GET'])
+app.add_url_rule('/profiles', view_func=list_profiles, methods=['GET'])
+app.add_url_rule('/profiles/<profile_id>', view_func=profile_details, methods=['GET'])
+app.add_url_rule('/profiles/<profile_id>/collapsed', view_func=profile_collapsed, methods=['GET'])
+app.add_url_rule('/profiles/<profile_id>/pstats', view_func=profile_pstats, methods=['GET'])
 
 @app.route('/')
 def home():
     """Render home page with available options."""
     return render_template("index.html")  # Make sure 'index.html' is located in the templates directory
 
-# Initialize managers only once
-container_manager = ContainerManager()
-dspy_manager = DSPyManager
+# Managers are shared with api_endpoints and built lazily on first use
+startup.mark_ready()
+startup.warm_up()
+if HOT_RELOAD:
+    module_reloader.instance()  # Starts the source watcher for in-process reloads
 
 if __name__ == '__main__':
+    # Development server; use `python asgi.py` for production serving
     app.run(host='0.0.0.0', port=8080)
@@ -1,8 +1,7 @@
 # module_runner.py  
-import io
 import sys
 import os
-import importlib.util
+from modules.worker_pool import get_worker_pool, WorkerCallError, WorkerTimeoutError
 
 # Get the root directory of the current script to ensure dynamic pathing
 repo_root = os.path.dirname(os.path.abspath(__file__))
@@ -13,49 +12,69 @@ def ensure_modules_folder(MODULES_FOLDER):
     if not os.path.exists(MODULES_FOLDER):
         os.makedirs(MODULES_FOLDER)
 
-# Function to run a module from the subfolder
-def run_module_from_subfolder(subfolder, module, function, MODULES_FOLDER=MODULES_FOLDER):
-    ensure_modules_folder(MODULES_FOLDER)  # Ensure the modules folder exists
-
+def resolve_module_path(subfolder, module, MODULES_FOLDER=MODULES_FOLDER):
+    """Return the path of modules/<subfolder>/<module>.py, or None (with a message) if it is missing."""
     subfolder_path = os.path.join(MODULES_FOLDER, subfolder)
 
     if not os.path.exists(subfolder_path):
         print(f"Subfolder '{subfolder_path}' not found. Please check the folder name and try again.")
-        return
+        return None
 
     module_path = os.path.join(subfolder_path, f"{module}.py")
 
     if not os.path.exists(module_path):
         print(f"Module '{module}' not found in subfolder '{subfolder}'. Please check the module name and try again.")
+        return None
+    return module_path
+
+# Function to run a module from the subfolder
+def run_module_from_subfolder(subfolder, module, function, MODULES_FOLDER=MODULES_FOLDER, args=(), kwargs=None,
+                              timeout=None, stream_output=False):
+    """Run a module function in a warm worker process.
+
+    Returns the pool's call dict ({"result", "stdout", "stderr", "seconds"}), or None if
+    the module was not found or the call failed, so a function that returns None is
+    still told apart from a failure. Output is captured per call; with
+    ``stream_output=True`` it is echoed as it is produced.
+    """
+    ensure_modules_folder(MODULES_FOLDER)  # Ensure the modules folder exists
+
+    module_path = resolve_module_path(subfolder, module, MODULES_FOLDER)
+    if module_path is None:
         return
 
     print(f"Attempting to load and run function: '{function}' from module: '{module}'")
 
+    def echo(stream, text):
+        (sys.stderr if stream == "stderr" else sys.stdout).write(text)
+
     try:
-        captured_output = io.StringIO()
-        original_stdout = sys.stdout
-        sys.stdout = captured_output
-
-        # Load the module dynamically
-        spec = importlib.util.spec_from_file_location(module, module_path)
-        loaded_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(loaded_module)
-
-        # Check for and execute the specified function if present
-        if hasattr(loaded_module, function):
-            print(f"Executing '{function}' function in module '{module}'")
-            getattr(loaded_module, function)()
-        else:
-            print(f"Module '{module}' does not have a function named '{function}' to execute.")
+        call = get_worker_pool().call(module_path, function, args, kwargs, timeout,
+                                      on_output=echo if stream_output else None)
+    except WorkerTimeoutError as e:
+        print(f"Function '{function}' in module '{module}' was stopped: {e}")
+        return
+    except WorkerCallError as e:
+        print(f"Error running function '{function}' in module '{module}': {e}\n"
+            "Ensure that the module is correctly implemented and has no syntax errors.")
+        return
 
-        sys.stdout = original_stdout
-        output = captured_output.getvalue()
+    if not stream_output:
+        output = call["stdout"] + call["stderr"]
         if output:
             print(f"Module Output:\n{output}")  # Print captured output
         else:
             print(f"Module '{module}' executed successfully, no output.")
+    return call
 
-    except Exception as e:
-        sys.stdout = original_stdout
-        print(f"Error running function '{function}' in module '{module}': {e}\n"
-            "Ensure that the module is correctly implemented and has no syntax errors.")
+# Function to run one module function over many inputs in parallel worker processes
+def map_module_function(subfolder, module, function, inputs, MODULES_FOLDER=MODULES_FOLDER, timeout=None,
+                        parallelism=None):
+    """Yield {"index", "result"|"error", "stdout", "stderr"} for each input as it finishes.
+
+    Each input is an args list, or a dict with "args" and/or "kwargs".
+    """
+    module_path = resolve_module_path(subfolder, module, MODULES_FOLDER)
+    if module_path is None:
+        return
+    yield from get_worker_pool().map(module_path, function, inputs, timeout=timeout, parallelism=parallelism)
@@ -2,14 +2,156 @@ import os
 import subprocess
 import shutil
 import re
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import git
 
+CONTEXT_SUFFIXES = ('.py', '.json', '.txt', '.csv')
+CONTEXT_FILENAMES = ('extra_model_paths.yml',)
+MANIFEST_NAME = '.context_manifest'  # Per-folder JSON record of size/mtime/hash for incremental syncs
+SYNC_WORKERS = int(os.getenv("CONTEXT_SYNC_WORKERS", "8"))
+
+def is_context_file(path):
+    return path.suffix in CONTEXT_SUFFIXES or path.name in CONTEXT_FILENAMES
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(folder_path):
+    manifest_path = Path(folder_path) / MANIFEST_NAME
+    try:
+        return json.loads(manifest_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(folder_path, manifest):
+    manifest_path = Path(folder_path) / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(manifest, sort_keys=True))
+    os.replace(tmp_path, manifest_path)
+
+def manifest_from_destination(folder_path):
+    """Build a stand-in manifest from the context files already in folder_path.
+
+    Folders copied before manifests existed have none; without this, files deleted
+    from the source would never be removed. Hashes are left to be computed on demand.
+    """
+    folder_path = Path(folder_path)
+    manifest = {}
+    for root, _, files in os.walk(folder_path):
+        for name in files:
+            dst_file = Path(root) / name
+            if is_context_file(dst_file):
+                manifest[dst_file.relative_to(folder_path).as_posix()] = {
+                    'size': None, 'mtime_ns': None, 'sha256': None,
+                }
+    return manifest
+
+def _sync_one(src_file, dst_file, rel, stat, previous):
+    """Copy one file if it is new or changed. Returns (rel, manifest entry, change type or None)."""
+    size, mtime_ns = stat.st_size, stat.st_mtime_ns
+    if previous and previous['size'] == size and previous['mtime_ns'] == mtime_ns and dst_file.exists():
+        return rel, previous, None
+    digest = file_hash(src_file)
+    entry = {'size': size, 'mtime_ns': mtime_ns, 'sha256': digest}
+    previous_digest = previous and previous['sha256']
+    if previous and previous_digest is None and dst_file.exists():
+        previous_digest = file_hash(dst_file)  # Entry bootstrapped from the destination tree
+    if previous and previous_digest == digest and dst_file.exists():
+        # Touched but identical: record the new mtime without copying.
+        return rel, entry, None
+    dst_file.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(src_file, dst_file)
+    return rel, entry, 'modified' if previous else 'added'
+
+def sync_local_folder(local_path, new_folder_path, workers=SYNC_WORKERS):
+    """Incrementally mirror context files from local_path into new_folder_path.
+
+    Uses a manifest of size, mtime and content hash so only new or changed files are
+    copied and only removed files are deleted. Returns a dict of added, modified,
+    removed and unchanged relative paths.
+    """
+    local_path, new_folder_path = Path(local_path), Path(new_folder_path)
+    new_folder_path.mkdir(parents=True, exist_ok=True)
+    if (new_folder_path / MANIFEST_NAME).exists():
+        manifest = load_manifest(new_folder_path)
+    else:
+        manifest = manifest_from_destination(new_folder_path)
+
+    sources = []
+    for root, _, files in os.walk(local_path):
+        for name in files:
+            src_file = Path(root) / name
+            if is_context_file(src_file):
+                rel = src_file.relative_to(local_path).as_posix()
+                sources.append((src_file, new_folder_path / rel, rel, src_file.stat(), manifest.get(rel)))
+
+    changes = {'added': [], 'modified': [], 'removed': [], 'unchanged': []}
+    new_manifest = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for rel, entry, change in executor.map(lambda args: _sync_one(*args), sources):
+            new_manifest[rel] = entry
+            changes[change or 'unchanged'].append(rel)
+
+    for rel in set(manifest) - set(new_manifest):
+        stale = new_folder_path / rel
+        if stale.exists():
+            stale.unlink()
+        changes['removed'].append(rel)
+
+    save_manifest(new_folder_path, new_manifest)
+    print(f"Synced {new_folder_path.name}: {len(changes['added'])} added, {len(changes['modified'])} modified, "
+          f"{len(changes['removed'])} removed, {len(changes['unchanged'])} unchanged.")
+    return changes
+
+def sparse_checkout_patterns():
+    """Non-cone sparse-checkout patterns matching the context file types."""
+    return [f"*{suffix}" for suffix in CONTEXT_SUFFIXES] + list(CONTEXT_FILENAMES)
+
+def fast_clone(repo_url, new_folder_path):
+    """Clone only the latest commit and only the blobs of context files.
+
+    Uses a depth-1 clone with a blob:none partial-clone filter, then a non-cone
+    sparse checkout, so blobs are fetched only for the paths that get checked out.
+    Falls back to a full clone if the server or local git does not support it.
+    """
+    try:
+        repo = git.Repo.clone_from(repo_url, new_folder_path, depth=1, filter='blob:none', no_checkout=True)
+        repo.git.sparse_checkout('set', '--no-cone', *sparse_checkout_patterns())
+        repo.git.checkout()
+        return repo
+    except git.GitCommandError as e:
+        print(f"Fast clone failed, falling back to a full clone: {e}")
+        shutil.rmtree(new_folder_path, ignore_errors=True)
+        return git.Repo.clone_from(repo_url, new_folder_path)
+
+def fast_update(repo):
+    """Fetch only the newest commit and move the sparse working tree to it."""
+    origin = repo.remotes.origin
+    branch = repo.active_branch.name
+    origin.fetch(branch, depth=1)
+    repo.git.reset('--hard', f"origin/{branch}")
+
 def is_github_url(url):
     github_pattern = r'https?://github\.com/[\w-]+/[\w-]+(?:\.git)?/?'
     return re.match(github_pattern, url) is not None
 
-def add_context_folder(repo_url):
+def add_context_folder(repo_url, incremental=True, fast=True):
+    """Add or update a context folder from a GitHub URL or a local path.
+
+    Local folders are synced incrementally unless incremental=False, in which case the
+    folder is removed and copied from scratch. GitHub repositories are cloned shallow
+    and sparse unless fast=False. Returns the change report for local folders, or None
+    for GitHub repositories.
+    """
+    changes = None
     context_folders_path = Path('context_folders')
     context_folders_path.mkdir(exist_ok=True)
 
@@ -19,28 +161,28 @@ def add_context_folder(repo_url):
         if new_folder_path.exists():
             print(f"Updating existing repository: {repo_name}")
             repo = git.Repo(new_folder_path)
-            origin = repo.remotes.origin
-            origin.pull()
+            if fast:
+                fast_update(repo)
+            else:
+                origin = repo.remotes.origin
+                origin.pull()
         else:
             print(f"Cloning new repository: {repo_name}")
-            git.Repo.clone_from(repo_url, new_folder_path)
+            if fast:
+                fast_clone(repo_url, new_folder_path)
+            else:
+                git.Repo.clone_from(repo_url, new_folder_path)
     else:
         local_path = Path(repo_url)
         new_folder_name = local_path.name
         new_folder_path = context_folders_path / new_folder_name
         if new_folder_path.exists():
             print(f"Updating existing folder: {new_folder_name}")
-            shutil.rmtree(new_folder_path)
+            if not incremental:
+                shutil.rmtree(new_folder_path)
         else:
             print(f"Adding new folder: {new_folder_name}")
-        new_folder_path.mkdir(parents=True, exist_ok=True)
-
-        for file in local_path.rglob('*'):
-            if file.is_file() and (file.suffix in ('.py', '.json', '.txt', '.csv') or file.name == 'extra_model_paths.yml'):
-                rel_path = file.relative_to(local_path)
-                dst_file = new_folder_path / rel_path
-                dst_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(file, dst_file)
+        changes = sync_local_folder(local_path, new_folder_path)
 
     gitignore_path = Path('.gitignore')
     gitignore_content = (
@@ -57,7 +199,24 @@ def add_context_folder(repo_url):
 
     try:
         repo = git.Repo('.')
-        repo.git.add('.')
+        # Stage only .gitignore and what changed, never unrelated work in the tree. A local
+        # sync stages just the files it copied or removed; a clone stages its folder.
+        paths = [gitignore_path.as_posix()]
+        removed = []
+        if changes is None:
+            paths.append(new_folder_path.as_posix())
+        else:
+            paths += [(new_folder_path / rel).as_posix() for rel in changes['added'] + changes['modified']]
+            removed = [(new_folder_path / rel).as_posix() for rel in changes['removed']]
+        ignored = set(repo.ignored(*paths))
+        paths = [path for path in paths if path not in ignored]
+        if paths:
+            repo.git.add('-A', '--', *paths)
+        if removed:
+            repo.git.rm('--cached', '--ignore-unmatch', '-q', '--', *removed)
+        if not repo.is_dirty(index=True, working_tree=False, untracked_files=False):
+            print(f"Context folder {new_folder_path.name} is already up to date.")
+            return changes
         repo.index.commit(f"Add/Update context folder: {new_folder_path.name}")
         origin = repo.remote('origin')
         origin.push()
@@ -65,6 +224,8 @@ def add_context_folder(repo_url):
     except git.GitCommandError as e:
         print(f"An error occurred while performing Git operations: {e}")
 
+    return changes
+
 if __name__ == "__main__":
     input_path = input("Enter the GitHub URL or local path of the folder you want to add as a context folder: ").strip()
     add_context_folder(input_path)
\ No newline at end of file
@@ -1,18 +1,114 @@
-from flask import request, jsonify
+import json
+import os
+import sys
+from flask import request, jsonify, make_response, Response, stream_with_context
 from flask_expects_json import expects_json
-from modules.container_manager import ContainerManager
-from modules.dspy_manager import DSPyManager
+from modules import metrics
+from modules.profiler import get_profiler, requested_mode
+from modules.startup import LazyManager, startup_report
+from modules.evaluation_runner import EvaluationConflictError, RUNNING
+from modules.job_manager import QueueFullError, SUCCEEDED, CANCELLED, FINISHED_STATES
 
-# Initialize the container and DSPy managers
-container_manager = ContainerManager()
-dspy_manager = DSPyManager()  # Removed LLM reference; aligned with modular management
+
+def _container_manager():
+    from modules.container_manager import ContainerManager
+    return ContainerManager()
+
+
+def _dspy_manager():
+    from modules.dspy_manager import DSPyManager
+    return DSPyManager()  # Removed LLM reference; aligned with modular management
+
+
+def _job_manager():
+    from modules.job_manager import JobManager
+    return JobManager(dspy_manager.instance())
+
+
+def _knowledge_writer():
+    from modules.knowledge_writer import KnowledgeWriter
+    return KnowledgeWriter()
+
+
+def _evaluation_manager():
+    from modules.evaluation_runner import EvaluationManager
+    return EvaluationManager(dspy_manager.instance())
+
+
+def _module_reloader():
+    from modules.hot_reload import ModuleReloader, HOT_RELOAD
+    reloader = ModuleReloader(dspy_manager.instance())
+    return reloader.start() if HOT_RELOAD else reloader
+
+
+# The container and DSPy managers are built on first use, so importing this module stays cheap
+container_manager = LazyManager("container_manager", _container_manager)
+dspy_manager = LazyManager("dspy_manager", _dspy_manager)
+job_manager = LazyManager("job_manager", _job_manager)
+knowledge_writer = LazyManager("knowledge_writer", _knowledge_writer)
+evaluation_manager = LazyManager("evaluation_manager", _evaluation_manager)
+module_reloader = LazyManager("module_reloader", _module_reloader)
+
+
+def _collect_manager_metrics():
+    """Scrape-time gauges read from managers that are already running; nothing is built for a scrape."""
+    samples = []
+    report = startup_report()
+    samples.append(("app_startup_ready_seconds", "gauge", "Seconds from process start to serving.", {},
+                    report["ready_seconds"]))
+    for name, seconds in report["timings"].items():
+        if name.startswith("init."):
+            samples.append(("app_manager_init_seconds", "gauge", "Time taken to build each lazy manager.",
+                            {"manager": name[len("init."):]}, seconds))
+    if dspy_manager.initialized:
+        cache = dspy_manager.result_cache.stats()
+        samples += [
+            ("result_cache_hits_total", "counter", "DSPy result cache hits.", {}, cache["hits"]),
+            ("result_cache_misses_total", "counter", "DSPy result cache misses.", {}, cache["misses"]),
+            ("result_cache_hit_ratio", "gauge", "DSPy result cache hit ratio.", {}, cache["hit_ratio"]),
+            ("result_cache_entries", "gauge", "DSPy result cache entries in memory.", {}, cache["memory_entries"]),
+        ]
+        last_load = dspy_manager.registry.last_load
+        if last_load:
+            samples.append(("dspy_registry_load_seconds", "gauge", "Time taken by the last registry load.",
+                            {"source": last_load["source"]}, last_load["seconds"]))
+    if job_manager.initialized:
+        jobs = job_manager.stats()
+        samples += [
+            ("job_queue_depth", "gauge", "Async jobs waiting for a worker.", {}, jobs["queue_depth"]),
+            ("jobs_running", "gauge", "Async jobs currently running.", {}, jobs["running"]),
+        ]
+    if knowledge_writer.initialized:
+        writer = knowledge_writer.status()
+        samples += [
+            ("knowledge_writer_pending", "gauge", "Knowledge triples buffered for Neo4j.", {}, writer["pending"]),
+            ("knowledge_writer_written_total", "counter", "Knowledge triples written to Neo4j.", {}, writer["written"]),
+            ("knowledge_writer_failed_flushes_total", "counter", "Failed knowledge flushes.", {},
+             writer["failed_flushes"]),
+        ]
+    ollama_client = sys.modules.get("modules.ollama_client")
+    if ollama_client is not None and ollama_client._default_client is not None:
+        lm = ollama_client._default_client.stats()
+        samples += [
+            ("lm_cache_hit_ratio", "gauge", "Ollama response cache hit ratio.", {}, lm["hit_ratio"]),
+            ("lm_effective_hit_ratio", "gauge", "Share of Ollama requests served without an upstream call.", {},
+             lm["effective_hit_ratio"]),
+            ("lm_requests_sent_total", "counter", "Requests sent to the Ollama server.", {}, lm["requests_sent"]),
+            ("lm_requests_in_flight", "gauge", "Requests to the Ollama server in flight.", {}, lm["limiter"]["active"]),
+            ("lm_requests_waiting", "gauge", "Requests waiting for an Ollama slot.", {}, lm["limiter"]["waiting"]),
+        ]
+    return samples
+
+
+metrics.REGISTRY.register_collector(_collect_manager_metrics)
 
 # JSON Schema for Docker management endpoint input validation
 docker_manage_schema = {
     "type": "object",
     "properties": {
         "action": {"type": "string", "enum": ["start", "stop"]},
-        "use_compose": {"type": "boolean"}
+        "use_compose": {"type": "boolean"},
+        "services": {"type": "array", "items": {"type": "string"}}
     },
     "required": ["action"]
 }
@@ -27,7 +123,12 @@ def docker_manage():
 
     try:
         if action == 'start':
-            container_manager.start_docker_containers(use_compose=use_compose)
+            report = container_manager.start_docker_containers(use_compose=use_compose, services=data.get('services'))
+            if report is not None:
+                failed = [name for name, entry in report["services"].items() if entry["status"] != "ready"]
+                if failed:
+                    return jsonify({"error": f"Services not ready: {', '.join(failed)}", **report}), 500
+                return jsonify({"message": "Containers started successfully.", **report})
         elif action == 'stop':
             container_manager.stop_docker_containers()
         else:
@@ -66,9 +167,33 @@ def execute_function():
     function_name = request.json.get('function_name')
     args = request.json.get('args', [])
     kwargs = request.json.get('kwargs', {})
+    use_cache = request.json.get('cache', True) and request.args.get('cache') != 'bypass'
+
+    # Opt-in async mode: queue the call and return a job id immediately
+    if request.json.get('async') or request.args.get('mode') == 'async':
+        try:
+            job = job_manager.submit(module_name, function_name, args, kwargs, use_cache=use_cache)
+        except QueueFullError as e:
+            return jsonify({"error": str(e)}), 503
+        return jsonify(job.to_dict()), 202
 
+    # Opt-in profiling: X-Profile header or ?profile=, honoured only when PROFILING_ENABLED is set
+    profile_mode = requested_mode(request.headers.get('X-Profile', request.args.get('profile')))
+    if profile_mode is None:
+        return _run_function(module_name, function_name, args, kwargs, use_cache)
+    # A cached result would leave nothing to profile, so profiled calls always run the function
+    with get_profiler().profile(f"{module_name}.{function_name}", profile_mode) as profile:
+        response = _run_function(module_name, function_name, args, kwargs, use_cache and profile is None)
+    response = make_response(response)
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+    else:
+        response.headers['X-Profile-Skipped'] = 'disabled' if not get_profiler().enabled else 'rate limited'
+    return response
+
+def _run_function(module_name, function_name, args, kwargs, use_cache):
     try:
-        result = dspy_manager.execute_function(module_name, function_name, *args, **kwargs)
+        result = dspy_manager.run_function(module_name, function_name, args, kwargs, use_cache=use_cache)
         if result is not None:
             return jsonify({"result": result})
         else:
@@ -76,16 +201,380 @@ def execute_function():
     except Exception as e:
         return jsonify({"error": f"Execution error. Details: {str(e)}"}), 500
 
+# Endpoint to get the status of an async job
+def job_status(job_id):
+    """Return the status of an async execution job."""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    return jsonify(job.to_dict())
+
+# Endpoint to get the result of an async job
+def job_result(job_id):
+    """Return the result of a finished async execution job."""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    if job.status not in FINISHED_STATES:
+        return jsonify(job.to_dict()), 202
+    if job.status != SUCCEEDED:
+        return jsonify(job.to_dict()), 409
+    return jsonify(job.to_dict(include_result=True))
+
+# Endpoint to cancel a queued async job
+def cancel_job(job_id):
+    """Cancel an async execution job that has not started yet."""
+    job = job_manager.cancel(job_id)
+    if not job:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    if job.status != CANCELLED:
+        return jsonify({"error": f"Job '{job_id}' is {job.status} and cannot be cancelled.", **job.to_dict()}), 409
+    return jsonify(job.to_dict())
+
+# Endpoint to report job queue depth and worker usage
+def job_queue():
+    """Return async job queue statistics."""
+    return jsonify(job_manager.stats())
+
+# JSON Schema for batch execution endpoint input validation
+execute_batch_schema = {
+    "type": "object",
+    "properties": {
+        "module_name": {"type": "string"},
+        "function_name": {"type": "string"},
+        "parallelism": {"type": "integer", "minimum": 1},
+        "cache": {"type": "boolean"},
+        "calls": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "function_name": {"type": "string"},
+                    "args": {"type": "array"},
+                    "kwargs": {"type": "object"}
+                }
+            }
+        }
+    },
+    "required": ["module_name", "calls"]
+}
+
+# Endpoint to execute many calls against one module, streaming NDJSON results
+@expects_json(execute_batch_schema)
+def execute_batch():
+    """Execute a batch of function calls concurrently and stream each result as a JSON line."""
+    data = request.get_json()
+    from modules.batch_executor import run_batch
+
+    results = run_batch(
+        dspy_manager.instance(),
+        data['module_name'],
+        data['calls'],
+        default_function=data.get('function_name'),
+        parallelism=data.get('parallelism'),
+        use_cache=data.get('cache', True),
+    )
+
+    def generate():
+        for item in results:
+            yield json.dumps(item, default=str) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Endpoint to report result cache statistics
+def cache_stats():
+    """Return DSPy result cache hit/miss statistics."""
+    return jsonify(dspy_manager.result_cache.stats())
+
+# Endpoint to clear the result cache
+def clear_cache():
+    """Clear all cached DSPy function results."""
+    dspy_manager.result_cache.clear()
+    return jsonify({"message": "Result cache cleared."})
+
+# JSON Schema for context retrieval endpoint input validation
+query_context_schema = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string"},
+        "queries": {"type": "array", "items": {"type": "string"}},
+        "k": {"type": "integer", "minimum": 1, "maximum": 1000},
+        "nprobe": {"type": "integer", "minimum": 1},
+        "ef_search": {"type": "integer", "minimum": 1}
+    }
+}
+
+# Endpoint to retrieve top-k context chunks from the local vector index
+@expects_json(query_context_schema)
+def query_context():
+    """Return the top-k context chunks for one query or a batch of queries."""
+    from modules import vector_index  # Deferred so faiss is only loaded when retrieval is used
+
+    data = request.get_json()
+    queries = data.get('queries') or ([data['query']] if data.get('query') else [])
+    if not queries:
+        return jsonify({"error": "Provide 'query' or a non-empty 'queries' list."}), 400
+
+    try:
+        results = vector_index.query_context(
+            queries,
+            k=data.get('k', 5),
+            nprobe=data.get('nprobe', vector_index.VECTOR_INDEX_NPROBE),
+            ef_search=data.get('ef_search', vector_index.VECTOR_INDEX_EF_SEARCH),
+        )
+    except FileNotFoundError as e:
+        return jsonify({"error": f"{e} Build it with 'python -m modules.vector_index'."}), 503
+    except Exception as e:
+        return jsonify({"error": f"Context query failed. Details: {str(e)}"}), 500
+
+    if 'queries' in data:
+        return jsonify({"results": results})
+    return jsonify({"results": results[0]})
+
+# JSON Schema for QA search endpoint input validation
+search_qa_schema = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string"},
+        "k": {"type": "integer", "minimum": 1, "maximum": 1000},
+        "mode": {"type": "string", "enum": ["bm25", "vector", "hybrid"]}
+    },
+    "required": ["query"]
+}
+
+# Endpoint to search the QA corpus in data/ with hybrid BM25 + vector ranking
+@expects_json(search_qa_schema)
+def search_qa():
+    """Return the best matching question/answer pairs for a query."""
+    from modules.qa_search import get_qa_index
+
+    data = request.get_json()
+    try:
+        results = get_qa_index().search(data['query'], k=data.get('k', 10), mode=data.get('mode', 'hybrid'))
+        return jsonify({"results": results})
+    except Exception as e:
+        return jsonify({"error": f"QA search failed. Details: {str(e)}"}), 500
+
+# JSON Schema for evaluation endpoint input validation
+start_evaluation_schema = {
+    "type": "object",
+    "properties": {
+        "run_id": {"type": "string", "pattern": "^[A-Za-z0-9_-]{1,64}$"},
+        "module_name": {"type": "string"},
+        "function_name": {"type": "string"},
+        "metric": {"type": "string"},
+        "metric_module": {"type": "string"},
+        "split": {"type": "string", "enum": ["train", "dev", "all"]},
+        "dev_fraction": {"type": "number", "minimum": 0, "maximum": 1},
+        "seed": {"type": "integer"},
+        "limit": {"type": "integer", "minimum": 1},
+        "input_keys": {"type": "array", "items": {"type": "string"}},
+        "num_threads": {"type": "integer", "minimum": 1},
+        "max_errors": {"type": "integer", "minimum": 0},
+        "stop_below": {"type": "number"},
+        "stop_above": {"type": "number"},
+        "min_examples": {"type": "integer", "minimum": 1},
+        "cache": {"type": "boolean"}
+    }
+}
+
+# Endpoint to start or resume a zero-shot evaluation run
+@expects_json(start_evaluation_schema)
+def start_evaluation():
+    """Start an evaluation of a module function over the QA dataset; pass run_id to resume."""
+    try:
+        run = evaluation_manager.start_from_config(request.get_json())
+    except EvaluationConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to start evaluation. Details: {str(e)}"}), 500
+    return jsonify(run.progress()), 202
+
+# Endpoint to poll evaluation progress
+def evaluation_status(run_id):
+    """Return progress and aggregate score for an evaluation run."""
+    run = evaluation_manager.get(run_id)
+    if not run:
+        return jsonify({"error": f"Evaluation '{run_id}' not found."}), 404
+    return jsonify(run.progress())
+
+# Endpoint to stream evaluation progress as server-sent events
+def evaluation_events(run_id):
+    """Stream evaluation progress as server-sent events until the run finishes."""
+    run = evaluation_manager.get(run_id)
+    if not run:
+        return jsonify({"error": f"Evaluation '{run_id}' not found."}), 404
+
+    def generate():
+        while True:
+            progress = run.progress()
+            yield f"data: {json.dumps(progress)}\n\n"
+            if progress["status"] != RUNNING:
+                break
+            run.wait_for_change(timeout=1.0)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+# Endpoint to stop an evaluation run early
+def stop_evaluation(run_id):
+    """Stop an evaluation run; it can be resumed later from its checkpoint."""
+    run = evaluation_manager.get(run_id)
+    if not run:
+        return jsonify({"error": f"Evaluation '{run_id}' not found."}), 404
+    run.stop()
+    return jsonify(run.progress())
+
+# Endpoint to report Ollama LM cache and deduplication statistics
+def lm_stats():
+    """Return hit-rate and in-flight deduplication statistics for the shared Ollama client."""
+    from modules.ollama_client import get_ollama_client
+    return jsonify(get_ollama_client().stats())
+
+# Endpoint to reload DSPy modules in-process
+def reload_modules():
+    """Reload one registered module (``module_name``) or a list of changed source ``paths``."""
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('module_name'):
+            report = module_reloader.reload_module(data['module_name'])
+        elif data.get('paths'):
+            report = module_reloader.reload_paths([os.path.abspath(path) for path in data['paths']])
+        else:
+            return jsonify({"error": "Provide 'module_name' or a list of 'paths'."}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": f"Reload failed. Details: {str(e)}"}), 500
+    return jsonify(report), 409 if report["errors"] else 200
+
+# Endpoint to report hot reload latency and history
+def reload_status():
+    """Return whether the watcher is running and recent reload latencies."""
+    return jsonify(module_reloader.stats())
+
 # Endpoint to add knowledge to Neo4j
 def add_knowledge():
     """API to add knowledge to Neo4j."""
+    from modules.knowledge_writer import BufferFullError, normalize_triple
+
+    data = request.get_json()
+    try:
+        triple = normalize_triple(data.get('subject'), data.get('relationship'), data.get('object'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        pending = knowledge_writer.add([triple])
+        subject, relationship, obj = triple
+        return jsonify({"message": f"Queued knowledge entry: ({subject})-[:{relationship}]->({obj})", "pending": pending}), 202
+    except BufferFullError as e:
+        return jsonify({"error": str(e), **knowledge_writer.status()}), 503
+    except Exception as e:
+        return jsonify({"error": f"Failed to add knowledge entry. Details: {str(e)}"}), 500
+
+# JSON Schema for bulk knowledge endpoint input validation
+add_knowledge_batch_schema = {
+    "type": "object",
+    "properties": {
+        "triples": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "subject": {"type": "string"},
+                    "relationship": {"type": "string"},
+                    "object": {"type": "string"}
+                },
+                "required": ["subject", "relationship", "object"]
+            }
+        },
+        "flush": {"type": "boolean"}
+    },
+    "required": ["triples"]
+}
+
+# Endpoint to add many knowledge triples to Neo4j at once
+@expects_json(add_knowledge_batch_schema)
+def add_knowledge_batch():
+    """API to buffer many knowledge triples for batched writes to Neo4j."""
+    from modules.knowledge_writer import BufferFullError, normalize_triple
+
     data = request.get_json()
-    subject, relationship, obj = data.get('subject'), data.get('relationship'), data.get('object')
-    if subject and relationship and obj:
+    triples, errors = [], []
+    for index, item in enumerate(data['triples']):
         try:
-            dspy_manager.add_knowledge_entry(subject.title(), relationship.upper(), obj.title())
-            return jsonify({"message": f"Added knowledge entry: ({subject.title()})-[:{relationship.upper()}]->({obj.title()})"})
-        except Exception as e:
-            return jsonify({"error": f"Failed to add knowledge entry. Details: {str(e)}"}), 500
-    else:
-        return jsonify({"error": "All fields (subject, relationship, object) are required."}), 400
+            triples.append(normalize_triple(item.get('subject'), item.get('relationship'), item.get('object')))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        return jsonify({"error": "Invalid knowledge triples.", "details": errors}), 400
+
+    try:
+        knowledge_writer.add(triples)
+        written = knowledge_writer.flush() if data.get('flush') else 0
+        return jsonify({"accepted": len(triples), "written": written,
+                        "pending": knowledge_writer.status()["pending"]}), 202
+    except BufferFullError as e:
+        return jsonify({"error": str(e), **knowledge_writer.status()}), 503
+
+# Endpoint to report knowledge writer buffer and flush status
+def knowledge_writer_status():
+    """Return the knowledge writer's buffer depth and flush statistics."""
+    return jsonify(knowledge_writer.status())
+
+# Endpoint to force a flush of buffered knowledge triples
+def flush_knowledge():
+    """Flush all buffered knowledge triples to Neo4j now."""
+    written = knowledge_writer.flush()
+    status = knowledge_writer.status()
+    if status["last_error"] and not written:
+        return jsonify({"error": f"Failed to flush knowledge triples. Details: {status['last_error']}", **status}), 500
+    return jsonify({"written": written, **status})
+
+# Endpoint to list stored profiles
+def list_profiles():
+    """List stored /execute_function profiles, newest first, with the profiler's rate-limit state."""
+    profiler = get_profiler()
+    return jsonify({"profiles": profiler.list(), "stats": profiler.stats()})
+
+# Endpoint to describe one profile
+def profile_details(profile_id):
+    """Return a profile's metadata, hottest functions and largest allocations."""
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        return jsonify({"error": f"Profile '{profile_id}' not found."}), 404
+    return jsonify(profile.to_dict(detail=True))
+
+# Endpoint to download a profile's collapsed stacks
+def profile_collapsed(profile_id):
+    """Return sampled stacks in collapsed format, for flamegraph.pl or speedscope."""
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        return jsonify({"error": f"Profile '{profile_id}' not found."}), 404
+    return Response(profile.collapsed, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={profile_id}.collapsed'})
+
+# Endpoint to download a profile's pstats data
+def profile_pstats(profile_id):
+    """Return cProfile data loadable with pstats.Stats or snakeviz."""
+    profile = get_profiler().get(profile_id)
+    if profile is None:
+        return jsonify({"error": f"Profile '{profile_id}' not found."}), 404
+    if profile.pstats_data is None:
+        return jsonify({"error": f"Profile '{profile_id}' was sampled only; request mode 'cprofile' for pstats."}), 404
+    return Response(profile.pstats_data, mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename={profile_id}.prof'})
+
+# Endpoint to expose Prometheus metrics
+def metrics_endpoint():
+    """Return request, DSPy function, database, cache and queue metrics in Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Endpoint to report cold-start timings
+def startup_status():
+    """Return time-to-ready, per-manager init times and which managers are built."""
+    report = startup_report()
+    if dspy_manager.initialized:
+        report["registry_load"] = dspy_manager.registry.last_load
+    return jsonify(report)
@@ -0,0 +1,277 @@
+# asgi_server.py
+
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", os.getenv("PORT", "8080")))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))  # Processes, each with its own executors
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", "8"))  # Threads for quick requests (status, stats, lists)
+SERVER_WORK_THREADS = int(os.getenv("SERVER_WORK_THREADS", "16"))  # Threads for DSPy, retrieval and DB work
+SERVER_DRAIN_TIMEOUT = float(os.getenv("SERVER_DRAIN_TIMEOUT", "30"))  # Seconds to let in-flight work finish
+SERVER_STREAM_BUFFER = 8  # Response chunks buffered per request before the worker thread waits for the client
+
+# Routes that block on DSPy calls, the vector index, the QA index or the databases. They get their own
+# executor so a burst of slow calls cannot starve status polling and stats.
+WORK_ROUTES = (
+    "/execute_function", "/execute_batch", "/query_context", "/search_qa",
+    "/add_knowledge", "/knowledge_writer/flush", "/evaluations", "/docker_manage",
+)
+
+_END = object()
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope and request body into a WSGI environ."""
+    server_name, server_port = scope.get("server") or ("localhost", SERVER_PORT)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": SERVER_WORKERS > 1,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+            continue
+        if name == "CONTENT_LENGTH":
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiServer:
+    """ASGI application that serves the Flask app from bounded thread pools.
+
+    The event loop only moves bytes; each request's Flask handler, and the iteration of
+    its (possibly streaming) response, runs on an executor thread, so long DSPy calls
+    never block other requests. On lifespan shutdown new requests get 503 while
+    in-flight ones finish, then queued jobs are drained and shared resources closed.
+    """
+
+    def __init__(self, wsgi_app, threads=SERVER_THREADS, work_threads=SERVER_WORK_THREADS,
+                 drain_timeout=SERVER_DRAIN_TIMEOUT, on_shutdown=None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi")
+        self.work_executor = ThreadPoolExecutor(max_workers=work_threads, thread_name_prefix="asgi-work")
+        self.drain_timeout = drain_timeout
+        self.on_shutdown = on_shutdown
+        self.draining = False
+        self.in_flight = 0
+        self._idle = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._idle = asyncio.Event()
+                self._idle.set()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.drain()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _executor_for(self, path):
+        if any(path == route or path.startswith(route + "/") for route in WORK_ROUTES):
+            return self.work_executor
+        return self.executor
+
+    async def _http(self, scope, receive, send):
+        if self.draining:
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"application/json"), (b"retry-after", b"5")]})
+            await send({"type": "http.response.body", "body": b'{"error": "Server is shutting down."}'})
+            return
+
+        self.in_flight += 1
+        if self._idle is not None:
+            self._idle.clear()
+        try:
+            body = bytearray()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.extend(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            await self._respond(scope, bytes(body), receive, send)
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def _respond(self, scope, body, receive, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SERVER_STREAM_BUFFER)
+        cancelled = threading.Event()
+        environ = build_environ(scope, body)
+
+        def put(item):
+            # Block the worker thread while the client is behind, but give up if it went away.
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    return future.result(timeout=1.0)
+                except FutureTimeout:
+                    if cancelled.is_set():
+                        future.cancel()
+                        return None
+
+        def run():
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response["status"] = int(status.split(" ", 1)[0])
+                response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+                return lambda data: None  # The legacy write() callable is not supported
+
+            iterable = self.wsgi_app(environ, start_response)
+            try:
+                started = False
+                for chunk in iterable:
+                    if cancelled.is_set():
+                        break
+                    if not started:
+                        put(response)
+                        started = True
+                    if chunk:
+                        put(chunk)
+                if not started:
+                    put(response)
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+                put(_END)
+
+        async def watch_disconnect():
+            # The body is fully read, so the next message is the client going away. Noticing it
+            # stops abandoned streams (SSE, NDJSON batches) from holding an executor thread.
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        future = loop.run_in_executor(self._executor_for(scope["path"]), run)
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            started = False
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, future, watcher}, return_when=asyncio.FIRST_COMPLETED)
+                if watcher in done:
+                    getter.cancel()
+                    cancelled.set()
+                    return
+                if getter not in done:
+                    getter.cancel()
+                    future.result()  # The handler failed before producing anything: re-raise
+                    continue
+                item = getter.result()
+                if item is _END:
+                    if not started:
+                        await future  # Re-raise the handler's error; uvicorn answers with a 500
+                        raise RuntimeError("WSGI app returned without starting a response.")
+                    break
+                if not started:
+                    await send({"type": "http.response.start", "status": item["status"], "headers": item["headers"]})
+                    started = True
+                else:
+                    await send({"type": "http.response.body", "body": item, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        except Exception:
+            cancelled.set()
+            raise
+        finally:
+            if not watcher.done():
+                watcher.cancel()
+            if not future.done():
+                cancelled.set()
+
+    async def drain(self):
+        """Refuse new requests, wait for in-flight ones, then run shutdown hooks off the event loop."""
+        self.draining = True
+        started = time.monotonic()
+        # Requests and shutdown hooks share one drain_timeout budget, so the whole drain is
+        # bounded by it and a container stop grace period just above it is never overrun.
+        deadline = started + self.drain_timeout
+        if self._idle is not None and self.in_flight:
+            logger.info(f"Draining {self.in_flight} in-flight requests...")
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.in_flight} requests still running after {self.drain_timeout}s drain timeout.")
+        loop = asyncio.get_running_loop()
+        if self.on_shutdown is not None:
+            await loop.run_in_executor(None, self.on_shutdown, deadline)
+        self.executor.shutdown(wait=False)
+        self.work_executor.shutdown(wait=False)
+        logger.info(f"Shutdown finished in {time.monotonic() - started:.2f}s.")
+
+
+def shutdown_managers(deadline=None):
+    """Checkpoint evaluations, cancel queued jobs, let running ones finish by ``deadline``,
+    flush knowledge and close DB connections.
+
+    ``deadline`` is a time.monotonic() value; it defaults to SERVER_DRAIN_TIMEOUT from now.
+    """
+    from modules import api_endpoints
+
+    if deadline is None:
+        deadline = time.monotonic() + SERVER_DRAIN_TIMEOUT
+
+    def remaining():
+        return max(0.0, deadline - time.monotonic())
+
+    if api_endpoints.evaluation_manager.initialized:
+        api_endpoints.evaluation_manager.shutdown(timeout=remaining())
+    if api_endpoints.job_manager.initialized:
+        api_endpoints.job_manager.shutdown(wait=True, timeout=remaining())
+    if api_endpoints.knowledge_writer.initialized:
+        api_endpoints.knowledge_writer.close()
+    for module_name, close in (("modules.postgres_pool", "close_pool"), ("modules.neo4j_manager", "close_drivers")):
+        module = sys.modules.get(module_name)  # Only close what this process actually opened
+        if module is not None:
+            try:
+                getattr(module, close)()
+            except Exception as e:
+                logger.warning(f"{module_name}.{close} failed during shutdown: {e}")
+
+
+def serve(app="asgi:app", host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS):
+    """Run the ASGI app under uvicorn."""
+    import uvicorn
+
+    # The extra seconds cover the knowledge flush and DB closes that run after the drain deadline.
+    uvicorn.run(app, host=host, port=port, workers=workers, lifespan="on",
+                timeout_graceful_shutdown=int(SERVER_DRAIN_TIMEOUT) + 5)
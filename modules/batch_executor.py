@@ -0,0 +1,62 @@
+# batch_executor.py
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from modules.metrics import tracked
+
+logger = logging.getLogger(__name__)
+
+BATCH_DEFAULT_PARALLELISM = int(os.getenv("BATCH_DEFAULT_PARALLELISM", "8"))
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "32"))
+
+
+def run_batch(dspy_manager, module_name, calls, default_function=None, parallelism=None, use_cache=True):
+    """Run many calls against one module concurrently, yielding results as they complete.
+
+    Each call is a dict with optional ``function_name``, ``args`` and ``kwargs``. Every
+    yielded item carries the call's ``index`` and either a ``result`` or an ``error``,
+    so one failing call never aborts the rest of the batch.
+    """
+    parallelism = max(1, min(parallelism or BATCH_DEFAULT_PARALLELISM, BATCH_MAX_PARALLELISM))
+
+    # Resolve the module once up front; per-function handles are cached by the registry.
+    module = dspy_manager.get_module_by_name(module_name)
+    if not module:
+        for index in range(len(calls)):
+            yield {"index": index, "error": f"Module '{module_name}' not found."}
+        return
+
+    module_info = dspy_manager.registry.get_entry(module_name)
+    module_version = dspy_manager.registry.module_version(module_name)
+    result_cache = dspy_manager.result_cache
+
+    def run_call(function_name, func, args, kwargs):
+        return result_cache.get_or_call(module_name, function_name, args, kwargs,
+                                        tracked(module_name, function_name, func),
+                                        module_info=module_info, bypass=not use_cache,
+                                        module_version=module_version)
+
+    executor = ThreadPoolExecutor(max_workers=min(parallelism, max(len(calls), 1)), thread_name_prefix="dspy-batch")
+    try:
+        futures = {}
+        for index, call in enumerate(calls):
+            function_name = call.get("function_name", default_function)
+            func = dspy_manager.registry.get_function(module_name, function_name) if function_name else None
+            if func is None:
+                yield {"index": index, "error": f"Function {function_name} not found in {module_name}."}
+                continue
+            future = executor.submit(run_call, function_name, func, call.get("args", []), call.get("kwargs", {}))
+            futures[future] = index
+
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield {"index": index, "result": future.result()}
+            except Exception as e:
+                logger.error(f"Batch call {index} to {module_name} failed: {e}")
+                yield {"index": index, "error": f"Execution error. Details: {str(e)}"}
+    finally:
+        # If the client goes away mid-stream, drop calls that have not started yet.
+        executor.shutdown(wait=False, cancel_futures=True)
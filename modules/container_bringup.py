@@ -0,0 +1,370 @@
+# container_bringup.py
+
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPOSE_PROJECT = os.getenv("COMPOSE_PROJECT_NAME", os.path.basename(REPO_ROOT).lower())
+READINESS_HOST = os.getenv("READINESS_HOST", "localhost")
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "120"))  # Seconds per service, unless x-readiness overrides
+PROBE_ATTEMPT_TIMEOUT = 2.0  # Seconds for a single probe attempt
+PROBE_INITIAL_DELAY = 0.05
+PROBE_MAX_DELAY = 2.0
+
+# Readiness endpoints for images whose open port is not enough to mean "ready".
+# A service can override these with an ``x-readiness`` block in docker-compose.yml.
+KNOWN_PROBES = {
+    "chromadb/chroma": {"type": "http", "path": "/api/v1/heartbeat"},
+    "ollama/ollama": {"type": "http", "path": "/api/tags"},
+    "neo4j": {"type": "http", "path": "/"},
+}
+
+_VARIABLE = re.compile(r"\$\{(\w+)(?:(:?-)([^}]*))?\}")
+
+
+def interpolate(value, environ=None):
+    """Expand ${VAR}, ${VAR:-default} and ${VAR-default} the way docker compose does."""
+    environ = os.environ if environ is None else environ
+
+    def replace(match):
+        name, operator, default = match.groups()
+        current = environ.get(name)
+        if operator == ":-" and not current:
+            return default
+        if operator == "-" and current is None:
+            return default
+        return current or ""
+
+    if isinstance(value, str):
+        return _VARIABLE.sub(replace, value)
+    if isinstance(value, list):
+        return [interpolate(item, environ) for item in value]
+    if isinstance(value, dict):
+        return {key: interpolate(item, environ) for key, item in value.items()}
+    return value
+
+
+def parse_duration(value, default=None):
+    """Seconds from a compose duration such as '10s', '1m30s' or '500ms'."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001, "us": 1e-6}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|us|h|m|s)", value)
+    return sum(float(number) * units[unit] for number, unit in parts) if parts else default
+
+
+class ServiceSpec:
+    """One service from docker-compose.yml, with its dependencies and readiness probe settings."""
+
+    def __init__(self, name, config, project=COMPOSE_PROJECT, base_dir=REPO_ROOT):
+        self.name = name
+        self.config = config
+        self.image = config.get("image")
+        self.container_name = config.get("container_name") or f"{project}-{name}-1"
+        self.project = project
+        self.base_dir = base_dir
+        depends_on = config.get("depends_on") or {}
+        if isinstance(depends_on, list):
+            depends_on = {dependency: {"condition": "service_started"} for dependency in depends_on}
+        self.depends_on = {dependency: (options or {}).get("condition", "service_started")
+                           for dependency, options in depends_on.items()}
+        self.readiness = config.get("x-readiness") or {}
+        self.timeout = float(self.readiness.get("timeout", READINESS_TIMEOUT))
+
+    def published_ports(self):
+        """Map of container port ('8000/tcp') to host port, from 'host:container' entries."""
+        ports = {}
+        for entry in self.config.get("ports", []):
+            parts = str(entry).split(":")
+            container_port = parts[-1] if "/" in parts[-1] else f"{parts[-1]}/tcp"
+            ports[container_port] = int(parts[-2]) if len(parts) >= 2 else None
+        return ports
+
+    def probe_settings(self):
+        """Readiness probe settings: x-readiness, else a known image probe, else the compose healthcheck or TCP."""
+        settings = dict(self.readiness)
+        if "type" not in settings:
+            image_name = (self.image or "").split(":")[0]
+            settings = {**KNOWN_PROBES.get(image_name, {}), **settings}
+        if "type" not in settings:
+            settings["type"] = "healthcheck" if self.config.get("healthcheck") else "tcp"
+        if settings["type"] in ("http", "tcp") and "port" not in settings:
+            host_ports = [port for port in self.published_ports().values() if port]
+            if not host_ports:
+                settings["type"] = "running"
+            else:
+                settings["port"] = host_ports[0]
+        return settings
+
+    def run_kwargs(self, network_names):
+        """Keyword arguments for docker's ``containers.run`` equivalent to this compose service."""
+        config = self.config
+        kwargs = {
+            "image": self.image,
+            "name": self.container_name,
+            "detach": True,
+            "labels": {"com.docker.compose.project": self.project, "com.docker.compose.service": self.name},
+        }
+        if config.get("command"):
+            kwargs["command"] = config["command"]
+        if config.get("environment"):
+            environment = config["environment"]
+            if isinstance(environment, list):
+                environment = dict(item.split("=", 1) if "=" in item else (item, "") for item in environment)
+            kwargs["environment"] = {key: "" if value is None else str(value) for key, value in environment.items()}
+        ports = self.published_ports()
+        if ports:
+            kwargs["ports"] = ports
+        volumes = {}
+        for entry in config.get("volumes", []):
+            parts = str(entry).split(":")
+            if len(parts) < 2:
+                continue
+            source = parts[0]
+            if source.startswith("."):
+                source = os.path.normpath(os.path.join(self.base_dir, source))
+            volumes[source] = {"bind": parts[1], "mode": parts[2] if len(parts) > 2 else "rw"}
+        if volumes:
+            kwargs["volumes"] = volumes
+        if network_names:
+            kwargs["network"] = network_names[0]
+        restart = config.get("restart")
+        if restart and restart != "no":
+            kwargs["restart_policy"] = {"Name": restart}
+        resources = (config.get("deploy") or {}).get("resources") or {}
+        limits = resources.get("limits") or {}
+        if limits.get("memory"):
+            kwargs["mem_limit"] = str(limits["memory"]).lower()
+        if limits.get("cpus"):
+            kwargs["nano_cpus"] = int(float(limits["cpus"]) * 1e9)
+        devices = (resources.get("reservations") or {}).get("devices") or []
+        if any("gpu" in (device.get("capabilities") or []) for device in devices):
+            kwargs["device_requests"] = [{"driver": "", "count": -1, "capabilities": [["gpu"]]}]
+        healthcheck = config.get("healthcheck")
+        if healthcheck and healthcheck.get("test"):
+            kwargs["healthcheck"] = {
+                "test": healthcheck["test"],
+                "interval": int(parse_duration(healthcheck.get("interval"), 30) * 1e9),
+                "timeout": int(parse_duration(healthcheck.get("timeout"), 30) * 1e9),
+                "retries": int(healthcheck.get("retries", 3)),
+                "start_period": int(parse_duration(healthcheck.get("start_period"), 0) * 1e9),
+            }
+        return kwargs
+
+
+def load_compose(path, environ=None, project=COMPOSE_PROJECT):
+    """Parse docker-compose.yml into (services by name, network names)."""
+    with open(path, "r") as file:
+        compose_data = interpolate(yaml.safe_load(file) or {}, environ)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    services = {name: ServiceSpec(name, config or {}, project, base_dir)
+                for name, config in (compose_data.get("services") or {}).items()}
+    networks = list((compose_data.get("networks") or {}).keys())
+    return services, networks
+
+
+def dependency_levels(services, names=None):
+    """Topological levels of the services to start; every service's dependencies are in earlier levels.
+
+    ``names`` limits bring-up to those services plus everything they depend on.
+    Raises ValueError for unknown dependencies or cycles.
+    """
+    wanted, stack = set(), list(names or services)
+    while stack:
+        name = stack.pop()
+        if name in wanted:
+            continue
+        if name not in services:
+            raise ValueError(f"Unknown service '{name}'.")
+        wanted.add(name)
+        stack.extend(services[name].depends_on)
+
+    levels, placed = [], set()
+    while len(placed) < len(wanted):
+        level = sorted(name for name in wanted - placed if set(services[name].depends_on) <= placed)
+        if not level:
+            raise ValueError(f"Dependency cycle between services: {', '.join(sorted(wanted - placed))}.")
+        levels.append(level)
+        placed.update(level)
+    return levels
+
+
+async def tcp_probe(host, port, timeout=PROBE_ATTEMPT_TIMEOUT):
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def http_probe(host, port, path="/", timeout=PROBE_ATTEMPT_TIMEOUT):
+    """True when GET ``path`` answers with a status below 500."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        parts = status_line.split()
+        return len(parts) >= 2 and parts[1].isdigit() and int(parts[1]) < 500
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        writer.close()
+
+
+async def wait_ready(probe, timeout, initial_delay=PROBE_INITIAL_DELAY, max_delay=PROBE_MAX_DELAY):
+    """Call ``probe()`` with jittered exponential backoff until it returns True or ``timeout`` passes."""
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        if await probe():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(remaining, delay * random.uniform(0.5, 1.0)))
+        delay = min(delay * 2, max_delay)
+
+
+class BringUp:
+    """Starts compose services through the Docker SDK, each as soon as its dependencies allow.
+
+    Services with no dependency between them start concurrently. A dependency with
+    ``condition: service_healthy`` is waited on until its readiness probe passes;
+    otherwise only until its container is started. ``client`` only needs
+    ``containers.get/run`` and ``networks.get/create``, so a fake client can stand in.
+    """
+
+    def __init__(self, client, services, networks=(), host=READINESS_HOST, probe_factory=None):
+        self.client = client
+        self.services = services
+        self.networks = list(networks)
+        self.host = host
+        self.probe_factory = probe_factory or self.make_probe
+        self.report = {}
+
+    def _network_names(self, spec):
+        declared = spec.config.get("networks") or []
+        names = list(declared) if isinstance(declared, (list, dict)) else []
+        return [f"{spec.project}_{name}" for name in names]
+
+    def _ensure_networks(self, names):
+        for name in names:
+            try:
+                self.client.networks.get(name)
+            except Exception:
+                self.client.networks.create(name, driver="bridge")
+
+    def _container(self, spec):
+        try:
+            return self.client.containers.get(spec.container_name)
+        except Exception:
+            return None
+
+    def _start(self, spec):
+        """Start an existing container or create it; runs on a worker thread."""
+        container = self._container(spec)
+        if container is not None:
+            if getattr(container, "status", None) == "running":
+                return "already running"
+            container.start()
+            return "started"
+        networks = self._network_names(spec)
+        self._ensure_networks(networks)
+        self.client.containers.run(**spec.run_kwargs(networks))
+        return "created"
+
+    def _container_state(self, spec):
+        container = self._container(spec)
+        if container is None:
+            return {}
+        container.reload()
+        return container.attrs.get("State", {})
+
+    def make_probe(self, spec):
+        settings = spec.probe_settings()
+        kind = settings["type"]
+        loop = asyncio.get_running_loop()
+        if kind == "http":
+            return lambda: http_probe(self.host, settings["port"], settings.get("path", "/"))
+        if kind == "tcp":
+            return lambda: tcp_probe(self.host, settings["port"])
+        if kind == "healthcheck":
+            async def probe():
+                state = await loop.run_in_executor(None, self._container_state, spec)
+                return state.get("Health", {}).get("Status") == "healthy"
+            return probe
+
+        async def probe():
+            state = await loop.run_in_executor(None, self._container_state, spec)
+            return state.get("Running", False)
+        return probe
+
+    async def _bring_up(self, spec, started, ready, started_at):
+        entry = self.report[spec.name] = {"status": "waiting", "depends_on": dict(spec.depends_on)}
+        try:
+            for dependency, condition in spec.depends_on.items():
+                event = ready[dependency] if condition == "service_healthy" else started[dependency]
+                await event.wait()
+                if self.report[dependency]["status"] == "failed":
+                    raise RuntimeError(f"Dependency '{dependency}' failed.")
+            entry["status"] = "starting"
+            entry["start_delay_seconds"] = time.monotonic() - started_at
+            loop = asyncio.get_running_loop()
+            entry["action"] = await loop.run_in_executor(None, self._start, spec)
+            entry["started_seconds"] = time.monotonic() - started_at
+            started[spec.name].set()
+            if not await wait_ready(self.probe_factory(spec), spec.timeout):
+                raise TimeoutError(f"Not ready after {spec.timeout:g}s ({spec.probe_settings()['type']} probe).")
+            entry["status"] = "ready"
+            entry["ready_seconds"] = time.monotonic() - started_at
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            logger.error(f"Service {spec.name} failed to come up: {e}")
+        finally:
+            started[spec.name].set()
+            ready[spec.name].set()
+
+    async def run(self, names=None):
+        """Bring up ``names`` (default: all services) and their dependencies. Returns the per-service report."""
+        levels = dependency_levels(self.services, names)
+        wanted = [name for level in levels for name in level]
+        started = {name: asyncio.Event() for name in wanted}
+        ready = {name: asyncio.Event() for name in wanted}
+        started_at = time.monotonic()
+        self.report = {}
+        await asyncio.gather(*(self._bring_up(self.services[name], started, ready, started_at) for name in wanted))
+        for name in wanted:
+            entry = self.report[name]
+            logger.info(f"{name}: {entry['status']}"
+                        + (f" in {entry['ready_seconds']:.2f}s" if "ready_seconds" in entry else "")
+                        + (f" ({entry['error']})" if "error" in entry else ""))
+        return {"levels": levels, "total_seconds": time.monotonic() - started_at, "services": self.report}
+
+
+def bring_up(compose_path, names=None, client=None, environ=None, probe_factory=None):
+    """Synchronously bring up services from a compose file with the Docker SDK."""
+    if client is None:
+        import docker
+        client = docker.from_env()
+    services, networks = load_compose(compose_path, environ)
+    return asyncio.run(BringUp(client, services, networks, probe_factory=probe_factory).run(names))
@@ -5,7 +5,10 @@ import logging
 
 # Set the compose file path based on your specific directory structure.
 # You can use an environment variable to override this if needed.
-COMPOSE_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docker-compose.yml')
+COMPOSE_FILE_PATH = os.getenv(
+    "COMPOSE_FILE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docker-compose.yml')
+)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -37,14 +40,23 @@ class ContainerManager:
         
         return containers
 
-    def start_docker_containers(self, use_compose=True):
-        """Start containers using Docker Compose or individually."""
+    def start_docker_containers(self, use_compose=True, services=None, client=None):
+        """Start containers using Docker Compose or individually.
+
+        Without compose, services are started through the Docker SDK in dependency
+        order, independent ones concurrently, and a per-service readiness report is returned.
+        """
         if use_compose:
             self._start_all_containers_with_compose()
+            return None
+        from modules.container_bringup import bring_up
+        report = bring_up(COMPOSE_FILE_PATH, names=services, client=client)
+        failed = [name for name, entry in report["services"].items() if entry["status"] != "ready"]
+        if failed:
+            logger.error(f"Services not ready: {', '.join(failed)}")
         else:
-            # Use the Docker API to start individual containers as needed
-            for container in self.containers:
-                self.start_container(container["name"])
+            logger.info(f"All services ready in {report['total_seconds']:.2f}s.")
+        return report
 
     def stop_docker_containers(self):
         """Stop containers using Docker Compose."""
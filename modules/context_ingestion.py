@@ -0,0 +1,259 @@
+# context_ingestion.py
+
+import argparse
+import ast
+import csv
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from modules.add_context_folder import MANIFEST_NAME, is_context_file
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_FOLDERS_PATH = os.getenv("CONTEXT_FOLDERS_PATH", "context_folders")
+CHROMA_PATH = os.getenv("CHROMA_PATH", "chroma_data")  # Used for the in-process persistent client
+CHROMA_HOST = os.getenv("CHROMA_HOST")  # When set, talk to the mwchromadb container instead
+CHROMA_PORT = int(os.getenv("MWCHROMADB_PORT", "8000"))
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "context")
+EMBED_MODEL = os.getenv("CONTEXT_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("CONTEXT_EMBED_BATCH_SIZE", "256"))
+EMBED_WORKERS = int(os.getenv("CONTEXT_EMBED_WORKERS", "2"))  # 0 embeds in-process
+CHUNK_CHARS = int(os.getenv("CONTEXT_CHUNK_CHARS", "2000"))
+CSV_ROWS_PER_CHUNK = int(os.getenv("CONTEXT_CSV_ROWS_PER_CHUNK", "20"))
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def iter_context_files(root=CONTEXT_FOLDERS_PATH):
+    """Yield every context file under root, lazily."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != ".git"]
+        for name in filenames:
+            path = Path(dirpath) / name
+            if name != MANIFEST_NAME and is_context_file(path):
+                yield path
+
+
+def chunk_text(text, max_chars=CHUNK_CHARS, start_line=1):
+    """Split text on line boundaries into chunks of at most max_chars. Yields (start, end, text)."""
+    lines, size, first = [], 0, start_line
+    for lineno, line in enumerate(text.splitlines(keepends=True), start=start_line):
+        if lines and size + len(line) > max_chars:
+            yield first, lineno - 1, "".join(lines)
+            lines, size, first = [], 0, lineno
+        lines.append(line)
+        size += len(line)
+    if lines:
+        yield first, first + len(lines) - 1, "".join(lines)
+
+
+def chunk_python(text, max_chars=CHUNK_CHARS):
+    """Chunk Python source along top-level definitions, falling back to line windows."""
+    try:
+        tree = ast.parse(text)
+    except SyntaxError:
+        yield from chunk_text(text, max_chars)
+        return
+
+    lines = text.splitlines(keepends=True)
+    cursor = 1
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+        if start > cursor:
+            # Module-level code between definitions (imports, constants, ...)
+            yield from chunk_text("".join(lines[cursor - 1:start - 1]), max_chars, cursor)
+        yield from chunk_text("".join(lines[start - 1:node.end_lineno]), max_chars, start)
+        cursor = node.end_lineno + 1
+    if cursor <= len(lines):
+        yield from chunk_text("".join(lines[cursor - 1:]), max_chars, cursor)
+
+
+def chunk_csv(text, rows_per_chunk=CSV_ROWS_PER_CHUNK):
+    """Chunk CSV row-wise, repeating the header in every chunk."""
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    if header is None:
+        return
+    rows, first = [], 2
+    for rowno, row in enumerate(reader, start=2):
+        rows.append(row)
+        if len(rows) == rows_per_chunk:
+            yield first, rowno, _format_csv(header, rows)
+            rows, first = [], rowno + 1
+    if rows:
+        yield first, first + len(rows) - 1, _format_csv(header, rows)
+
+
+def _format_csv(header, rows):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def chunk_file(path, root=CONTEXT_FOLDERS_PATH):
+    """Yield chunk dicts (id, text, metadata) for one file, chunked by file type."""
+    try:
+        text = Path(path).read_text(encoding="utf-8", errors="replace")
+    except OSError as e:
+        logger.warning(f"Skipping unreadable file {path}: {e}")
+        return
+    if not text.strip():
+        return
+
+    suffix = Path(path).suffix
+    if suffix == ".py":
+        pieces = chunk_python(text)
+    elif suffix == ".csv":
+        pieces = chunk_csv(text)
+    else:
+        pieces = chunk_text(text)
+
+    source = Path(path).relative_to(root).as_posix()
+    for start, end, chunk in pieces:
+        if not chunk.strip():
+            continue
+        yield {
+            "id": f"{source}:{start}-{end}",
+            "text": chunk,
+            "metadata": {"source": source, "start": start, "end": end, "hash": content_hash(chunk)},
+        }
+
+
+def iter_chunks(root=CONTEXT_FOLDERS_PATH):
+    for path in iter_context_files(root):
+        yield from chunk_file(path, root)
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_model = None
+
+
+def _init_embedder(model_name):
+    global _model
+    from sentence_transformers import SentenceTransformer
+    _model = SentenceTransformer(model_name)
+
+
+def embed_texts(texts, model_name=EMBED_MODEL):
+    """Embed texts with the worker's (or this process's) sentence-transformers model."""
+    if _model is None:
+        _init_embedder(model_name)
+    return _model.encode(texts, batch_size=len(texts), convert_to_numpy=True).tolist()
+
+
+def get_chroma_client(path=CHROMA_PATH, host=CHROMA_HOST, port=CHROMA_PORT):
+    """Return an HTTP client for the mwchromadb container if host is set, else a persistent local client."""
+    import chromadb
+    if host:
+        return chromadb.HttpClient(host=host, port=port)
+    return chromadb.PersistentClient(path=path)
+
+
+def existing_hashes(collection, page_size=10000):
+    """Map chunk id to content hash for everything already in the collection."""
+    hashes, offset = {}, 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+            hashes[chunk_id] = (metadata or {}).get("hash")
+        if len(page["ids"]) < page_size:
+            return hashes
+        offset += page_size
+
+
+def ingest_context_folders(root=CONTEXT_FOLDERS_PATH, client=None, collection_name=CHROMA_COLLECTION,
+                           model_name=EMBED_MODEL, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS,
+                           delete_stale=True):
+    """Chunk, embed and upsert every context file into a Chroma collection.
+
+    Chunks whose id and content hash are already stored are skipped. Embedding runs
+    on a process pool, one batch per task, while upserts happen in this process.
+    With delete_stale, chunks for removed files or changed chunk boundaries are deleted.
+    Returns counts of upserted, skipped and deleted chunks.
+    """
+    client = client or get_chroma_client()
+    collection = client.get_or_create_collection(collection_name, metadata={"hnsw:space": "cosine"})
+    known = existing_hashes(collection)
+    seen = set()
+    stats = {"upserted": 0, "skipped": 0, "deleted": 0}
+
+    def pending_chunks():
+        for chunk in iter_chunks(root):
+            seen.add(chunk["id"])
+            if known.get(chunk["id"]) == chunk["metadata"]["hash"]:
+                stats["skipped"] += 1
+                continue
+            yield chunk
+
+    def upsert(batch, embeddings):
+        collection.upsert(
+            ids=[c["id"] for c in batch],
+            embeddings=embeddings,
+            documents=[c["text"] for c in batch],
+            metadatas=[c["metadata"] for c in batch],
+        )
+        stats["upserted"] += len(batch)
+        logger.info(f"Upserted {stats['upserted']} chunks ({stats['skipped']} unchanged so far)")
+
+    batches = batched(pending_chunks(), batch_size)
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_embedder, initargs=(model_name,)) as pool:
+            # Keep a bounded number of batches in flight so memory stays flat on huge trees.
+            in_flight = []
+            for batch in batches:
+                in_flight.append((batch, pool.submit(embed_texts, [c["text"] for c in batch], model_name)))
+                if len(in_flight) >= workers * 2:
+                    done_batch, future = in_flight.pop(0)
+                    upsert(done_batch, future.result())
+            for done_batch, future in in_flight:
+                upsert(done_batch, future.result())
+    else:
+        for batch in batches:
+            upsert(batch, embed_texts([c["text"] for c in batch], model_name))
+
+    if delete_stale:
+        stale = [chunk_id for chunk_id in known if chunk_id not in seen]
+        for ids in batched(stale, batch_size):
+            collection.delete(ids=ids)
+        stats["deleted"] = len(stale)
+
+    print(f"Context ingestion complete: {stats['upserted']} upserted, {stats['skipped']} unchanged, "
+          f"{stats['deleted']} deleted.")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index context_folders into a Chroma collection.")
+    parser.add_argument("--root", default=CONTEXT_FOLDERS_PATH)
+    parser.add_argument("--collection", default=CHROMA_COLLECTION)
+    parser.add_argument("--chroma-path", default=CHROMA_PATH)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    args = parser.parse_args()
+    ingest_context_folders(
+        root=args.root,
+        client=get_chroma_client(path=args.chroma_path),
+        collection_name=args.collection,
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
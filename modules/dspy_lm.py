@@ -0,0 +1,73 @@
+# dspy_lm.py
+
+from types import SimpleNamespace
+
+import dspy
+
+from modules.ollama_client import get_ollama_client
+
+# DSPy option names mapped to their Ollama equivalents; anything else is passed through as-is.
+OLLAMA_OPTION_NAMES = {"max_tokens": "num_predict"}
+# DSPy bookkeeping fields that are not model options.
+IGNORED_OPTIONS = ("cache", "rollout_id", "num_retries")
+
+
+def _completion(response, model):
+    """Shape an Ollama /api/chat response like the litellm ModelResponse DSPy expects."""
+    message = response.get("message") or {}
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    completion_tokens = response.get("eval_count") or 0
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(
+            index=0,
+            message=SimpleNamespace(role="assistant", content=message.get("content", ""), tool_calls=None),
+            finish_reason=response.get("done_reason", "stop"),
+            logprobs=None,
+        )],
+        usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+               "total_tokens": prompt_tokens + completion_tokens},
+    )
+
+
+class OllamaLM(dspy.BaseLM):
+    """DSPy language model that sends every call through the shared OllamaClient.
+
+    DSPy programs then get the client's response cache, single-flight deduplication,
+    pooled connections and concurrency limit. DSPy's own cache is turned off so
+    responses are not cached twice; pass ``cache=False`` in a call to skip ours.
+    """
+
+    def __init__(self, model, client=None, temperature=0.0, max_tokens=1000, **kwargs):
+        # Accept litellm-style names such as "ollama_chat/llama3.1".
+        model = model.split("/", 1)[1] if model.startswith(("ollama/", "ollama_chat/")) else model
+        super().__init__(model=model, model_type="chat", temperature=temperature, max_tokens=max_tokens,
+                         cache=False, **kwargs)
+        self.client = client or get_ollama_client()
+
+    def forward(self, prompt=None, messages=None, **kwargs):
+        messages = messages or [{"role": "user", "content": prompt}]
+        options = {**self.kwargs, **kwargs}
+        cache = options.pop("cache", True)
+        n = options.pop("n", 1) or 1
+        for name in IGNORED_OPTIONS:
+            options.pop(name, None)
+        options = {OLLAMA_OPTION_NAMES.get(name, name): value for name, value in options.items()}
+        completions = [
+            # Extra samples must not come back from the cache as copies of the first.
+            self.client.chat(self.model, messages, options=options, cache=cache and i == 0)
+            for i in range(n)
+        ]
+        result = _completion(completions[0], self.model)
+        for i, response in enumerate(completions[1:], start=1):
+            choice = _completion(response, self.model).choices[0]
+            choice.index = i
+            result.choices.append(choice)
+        return result
+
+
+def configure_dspy_lm(model, **kwargs):
+    """Make an OllamaLM for ``model`` DSPy's default LM and return it."""
+    lm = OllamaLM(model, **kwargs)
+    dspy.configure(lm=lm)
+    return lm
@@ -1,64 +1,85 @@
-import yaml
-import importlib
 import os
+from modules.metrics import tracked
+from modules.module_registry import ModuleRegistry
+from modules.result_cache import ResultCache
 
 YAML_PATH = os.getenv("YAML_PATH", "dspy_modules.yaml")
+DSPY_LM_MODEL = os.getenv("DSPY_LM_MODEL")  # Ollama model DSPy should call through the shared OllamaClient
 
 class DSPyManager:
     def __init__(self):
         """Initialize DSPy Manager with modules loaded from a YAML file."""
-        self.dspy_modules = self.load_dspy_modules()
+        self.registry = ModuleRegistry(YAML_PATH)
+        self.result_cache = ResultCache()
+        if DSPY_LM_MODEL:
+            from modules.dspy_lm import configure_dspy_lm
+            configure_dspy_lm(DSPY_LM_MODEL)
+
+    @property
+    def dspy_modules(self):
+        """The DSPy module metadata, reloaded automatically when the YAML file changes."""
+        return self.registry.modules
 
     def load_dspy_modules(self):
-        """Load the DSPy modules metadata from the YAML file."""
-        try:
-            with open(YAML_PATH, 'r') as file:
-                dspy_data = yaml.safe_load(file)
-            return dspy_data.get("dspy_modules", [])
-        except FileNotFoundError:
-            print(f"Error: YAML file not found at {YAML_PATH}")
-            return []
-        except yaml.YAMLError as e:
-            print(f"Error: Failed to parse YAML file at {YAML_PATH}. Details: {e}")
-            return []
+        """Force a reload of the DSPy modules metadata from the YAML file."""
+        self.registry.refresh(force=True)
+        return self.registry.modules
+
+    def swap_module(self, module_name, module):
+        """Serve ``module_name`` from a reloaded module object from now on, dropping its cached results."""
+        self.registry.swap_module(module_name, module)
+        self.result_cache.invalidate_module(module_name)
 
     def get_module_by_name(self, module_name):
-        """Dynamically import a module by name using the metadata from the YAML file."""
-        for module_info in self.dspy_modules:
-            if module_info["name"] == module_name:
-                try:
-                    # Import module dynamically using import path from YAML
-                    module = importlib.import_module(module_info["import_path"])
-                    return module
-                except ModuleNotFoundError as e:
-                    print(f"Error: Module '{module_name}' not found. Details: {e}")
-                    return None
-                except Exception as e:
-                    print(f"Error: An unexpected error occurred while importing module '{module_name}'. Details: {e}")
-                    return None
-        return None
+        """Return the module for a name, importing it on first use and caching the handle."""
+        try:
+            return self.registry.get_module(module_name)
+        except ModuleNotFoundError as e:
+            print(f"Error: Module '{module_name}' not found. Details: {e}")
+            return None
+        except Exception as e:
+            print(f"Error: An unexpected error occurred while importing module '{module_name}'. Details: {e}")
+            return None
 
-    def execute_function(self, module_name, function_name, *args, **kwargs):
-        """Execute a selected function from a given module."""
+    def get_function(self, module_name, function_name):
+        """Return the cached callable for a module function, or None if unavailable."""
         module = self.get_module_by_name(module_name)
         if not module:
             print("Module not found.")
             return None
 
-        func = getattr(module, function_name, None)
-        if callable(func):
-            try:
-                print(f"Executing {function_name} from {module_name} with arguments {args} and keyword arguments {kwargs}...")
-                result = func(*args, **kwargs)
-                return result
-            except TypeError as e:
-                print(f"Error executing function '{function_name}': {e}")
-                return None
-            except Exception as e:
-                print(f"Error executing function '{function_name}': {e}")
-                return None
-        else:
+        func = self.registry.get_function(module_name, function_name)
+        if func is None:
             print(f"Function {function_name} not found in {module_name}.")
+        return func
+
+    def execute_function(self, module_name, function_name, *args, **kwargs):
+        """Execute a selected function from a given module."""
+        return self.run_function(module_name, function_name, args, kwargs)
+
+    def run_function(self, module_name, function_name, args=(), kwargs=None, use_cache=True):
+        """Execute a module function, serving repeated calls from the result cache.
+
+        Pass ``use_cache=False`` to bypass the cache for this call.
+        """
+        kwargs = kwargs or {}
+        func = self.get_function(module_name, function_name)
+        if func is None:
+            return None
+
+        try:
+            print(f"Executing {function_name} from {module_name} with arguments {args} and keyword arguments {kwargs}...")
+            result = self.result_cache.get_or_call(
+                module_name, function_name, args, kwargs, tracked(module_name, function_name, func),
+                module_info=self.registry.get_entry(module_name), bypass=not use_cache,
+                module_version=self.registry.module_version(module_name),
+            )
+            return result
+        except TypeError as e:
+            print(f"Error executing function '{function_name}': {e}")
+            return None
+        except Exception as e:
+            print(f"Error executing function '{function_name}': {e}")
             return None
 
     def list_functions(self, module_name):
@@ -68,7 +89,7 @@ class DSPyManager:
             print(f"Module '{module_name}' not found.")
             return []
 
-        functions = [func for func in dir(module) if callable(getattr(module, func)) and not func.startswith("__")]
+        functions = self.registry.list_functions(module_name)
         for idx, func in enumerate(functions):
             print(f"{idx + 1}: {func}")
         return functions
@@ -3,6 +3,7 @@ import importlib
 import os
 import sys
 import logging
+from modules.module_registry import ModuleRegistry, clean_import_path
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -10,54 +11,66 @@ logging.basicConfig(level=logging.INFO)
 
 YAML_PATH = os.getenv("YAML_PATH", "./dspy_modules.yaml")
 
+# Shared name-indexed registry; reloads itself when the YAML file changes on disk.
+registry = ModuleRegistry(YAML_PATH)
+
 
 def load_dspy_modules():
     """Load the DSPy modules metadata from the YAML file."""
     try:
-        with open(YAML_PATH, 'r') as file:
-            dspy_data = yaml.safe_load(file)
-        return dspy_data["dspy_modules"]
-    except FileNotFoundError:
-        logger.error(f"The YAML file at {YAML_PATH} was not found.")
-        return []
-    except yaml.YAMLError as e:
-        logger.error(f"Failed to parse the YAML file at {YAML_PATH}. Details: {e}")
-        return []
+        return registry.modules
     except Exception as e:
         logger.error(f"An unexpected error occurred while loading the YAML file. Details: {e}")
         return []
 
 
-def get_module_by_name(module_name, dspy_modules):
-    """Dynamically import a module by name using the metadata from the YAML file."""
+def _uses_registry(dspy_modules):
+    return dspy_modules is None or dspy_modules is registry.modules
+
+
+def _find_module_info(module_name, dspy_modules):
+    """Look up a module entry, using the registry index when given the registry's own list."""
+    if _uses_registry(dspy_modules):
+        return registry.get_entry(module_name)
     for module_info in dspy_modules:
         if module_info["name"] == module_name:
-            try:
-                # Attempt to import using the custom DSPy path from the project directory
-                module = importlib.import_module(module_info["import_path"])
-                return module
-            except ModuleNotFoundError as e:
-                logger.warning(f"Module '{module_name}' not found in the project directory. Trying site-packages. Details: {e}")
-                try:
-                    # Attempt to import from the global site-packages instead
-                    sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))  # Add fallback path
-                    module = importlib.import_module(module_info["import_path"])
-                    # Update the YAML with the correct working path if the fallback succeeds
-                    update_yaml_with_working_path(module_name, module_info["import_path"])
-                    return module
-                except ModuleNotFoundError as e:
-                    logger.error(f"Module '{module_name}' not found in site-packages either. Details: {e}")
-                    return None
-                except Exception as e:
-                    logger.error(f"Unexpected error when importing module '{module_name}' from site-packages. Details: {e}")
-                    return None
-            except Exception as e:
-                logger.error(f"An unexpected error occurred while importing module '{module_name}'. Details: {e}")
-                return None
-    logger.error(f"Module '{module_name}' not found in available DSPy modules.")
+            return module_info
     return None
 
 
+def get_module_by_name(module_name, dspy_modules=None):
+    """Dynamically import a module by name using the metadata from the YAML file."""
+    module_info = _find_module_info(module_name, dspy_modules)
+    if module_info is None:
+        logger.error(f"Module '{module_name}' not found in available DSPy modules.")
+        return None
+
+    import_path = clean_import_path(module_info["import_path"])
+    try:
+        # Attempt to import using the custom DSPy path from the project directory
+        if _uses_registry(dspy_modules):
+            return registry.get_module(module_name)
+        return importlib.import_module(import_path)
+    except ModuleNotFoundError as e:
+        logger.warning(f"Module '{module_name}' not found in the project directory. Trying site-packages. Details: {e}")
+        try:
+            # Attempt to import from the global site-packages instead
+            sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))  # Add fallback path
+            module = importlib.import_module(import_path)
+            # Update the YAML with the correct working path if the fallback succeeds
+            update_yaml_with_working_path(module_name, import_path)
+            return module
+        except ModuleNotFoundError as e:
+            logger.error(f"Module '{module_name}' not found in site-packages either. Details: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error when importing module '{module_name}' from site-packages. Details: {e}")
+            return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while importing module '{module_name}'. Details: {e}")
+        return None
+
+
 def update_yaml_with_working_path(module_name, import_path):
     """Update the YAML file with the working import path to optimize future imports."""
     try:
@@ -81,11 +94,13 @@ def list_available_modules(dspy_modules):
         logger.info(f"{idx + 1}: {module['name']} - {module['description']}")
 
 
-def list_functions(module_name, dspy_modules):
+def list_functions(module_name, dspy_modules=None):
     """List all functions available in a given DSPy module."""
     module = get_module_by_name(module_name, dspy_modules)
     if not module:
         return []
+    if _uses_registry(dspy_modules):
+        return registry.list_functions(module_name)
     return [func for func in dir(module) if callable(getattr(module, func)) and not func.startswith("__")]
 
 
@@ -96,7 +111,10 @@ def execute_function(module_name, function_name, dspy_modules, *args, **kwargs):
         logger.error("Module not found.")
         return None
 
-    func = getattr(module, function_name, None)
+    if _uses_registry(dspy_modules):
+        func = registry.get_function(module_name, function_name)
+    else:
+        func = getattr(module, function_name, None)
     if callable(func):
         try:
             logger.info(f"Executing {function_name} from {module_name} with arguments {args} and keyword arguments {kwargs}...")
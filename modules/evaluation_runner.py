@@ -0,0 +1,333 @@
+# evaluation_runner.py
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from modules.metrics import tracked
+
+logger = logging.getLogger(__name__)
+
+EVAL_CHECKPOINT_DIR = os.getenv("EVAL_CHECKPOINT_DIR", "eval_checkpoints")
+EVAL_DEFAULT_THREADS = int(os.getenv("EVAL_DEFAULT_THREADS", "8"))
+EVAL_MAX_THREADS = int(os.getenv("EVAL_MAX_THREADS", "64"))
+
+DEFAULT_INPUT_KEYS = ("question",)
+RUN_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")  # Run ids become checkpoint file names
+
+RUNNING, COMPLETED, STOPPED, FAILED = "running", "completed", "stopped", "failed"
+
+
+def _prediction_text(prediction):
+    """Pull the answer text out of a DSPy Prediction, a dict or a plain value."""
+    if hasattr(prediction, "answer"):
+        prediction = prediction.answer
+    elif isinstance(prediction, dict) and "answer" in prediction:
+        prediction = prediction["answer"]
+    return "" if prediction is None else str(prediction)
+
+
+def _normalize(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def exact_match(example, prediction):
+    return float(_normalize(_prediction_text(prediction)) == _normalize(str(example.get("answer", ""))))
+
+
+def answer_contains(example, prediction):
+    answer = _normalize(str(example.get("answer", "")))
+    return float(bool(answer) and answer in _normalize(_prediction_text(prediction)))
+
+
+def token_f1(example, prediction):
+    predicted = _normalize(_prediction_text(prediction)).split()
+    gold = _normalize(str(example.get("answer", ""))).split()
+    common = sum((Counter(predicted) & Counter(gold)).values())
+    if not common:
+        return 0.0
+    precision, recall = common / len(predicted), common / len(gold)
+    return 2 * precision * recall / (precision + recall)
+
+
+BUILTIN_METRICS = {"exact_match": exact_match, "contains": answer_contains, "f1": token_f1}
+
+
+class EvaluationConflictError(Exception):
+    """Raised when a resume request's config differs from the config saved for that run id."""
+
+
+def validate_run_id(run_id):
+    if not isinstance(run_id, str) or not RUN_ID_PATTERN.fullmatch(run_id):
+        raise ValueError("run_id must be 1-64 letters, digits, '_' or '-'.")
+    return run_id
+
+
+class EvaluationRun:
+    """One evaluation of a module function over a dataset view, checkpointed to disk.
+
+    Every scored example is appended to ``<checkpoint_dir>/<run_id>.jsonl``, so starting
+    a run with the same id skips the examples that are already scored.
+    """
+
+    def __init__(self, run_id, func, metric, rows, input_keys=DEFAULT_INPUT_KEYS, num_threads=EVAL_DEFAULT_THREADS,
+                 max_errors=None, stop_below=None, stop_above=None, min_examples=50,
+                 checkpoint_dir=EVAL_CHECKPOINT_DIR, call=None):
+        self.id = validate_run_id(run_id)
+        self.func = func
+        self.metric = metric
+        self.rows = rows
+        self.input_keys = tuple(input_keys)
+        self.num_threads = max(1, min(num_threads, EVAL_MAX_THREADS))
+        self.max_errors = max_errors
+        self.stop_below = stop_below
+        self.stop_above = stop_above
+        self.min_examples = min_examples
+        self.call = call or (lambda func, kwargs: func(**kwargs))
+        self.checkpoint_path = Path(checkpoint_dir) / f"{run_id}.jsonl"
+        self.status = RUNNING
+        self.stop_reason = None
+        self.total = len(rows)
+        self.scores = {}
+        self._score_sum = 0.0
+        self.errors = 0
+        self.resumed = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._changed = threading.Condition(self._lock)
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path.exists():
+            return
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn final line from an interrupted run
+                if record.get("error"):
+                    continue  # Retry errored examples on resume
+                self.scores[record["index"]] = record["score"]
+        self._score_sum = sum(self.scores.values())
+        self.resumed = len(self.scores)
+
+    def _record(self, checkpoint, index, score=None, error=None):
+        with self._lock:
+            if error is None:
+                self.scores[index] = score
+                self._score_sum += score
+            else:
+                self.errors += 1
+            checkpoint.write(json.dumps({"index": index, "score": score, "error": error}) + "\n")
+            checkpoint.flush()
+            self._check_early_stop()
+            self._changed.notify_all()
+
+    def _check_early_stop(self):
+        if self.max_errors is not None and self.errors > self.max_errors:
+            self.stop(f"More than {self.max_errors} errors.")
+        elif len(self.scores) >= self.min_examples:
+            mean = self.mean_score
+            if self.stop_below is not None and mean < self.stop_below:
+                self.stop(f"Mean score {mean:.4f} fell below {self.stop_below} after {len(self.scores)} examples.")
+            elif self.stop_above is not None and mean >= self.stop_above:
+                self.stop(f"Mean score {mean:.4f} reached {self.stop_above} after {len(self.scores)} examples.")
+
+    def _evaluate(self, index):
+        row = self.rows[index]
+        prediction = self.call(self.func, {key: row[key] for key in self.input_keys})
+        return float(self.metric(row, prediction))
+
+    def run(self):
+        """Score every remaining example on a thread pool; blocks until done or stopped."""
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        pending = (i for i in range(self.total) if i not in self.scores)
+        try:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+                    ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix=f"eval-{self.id[:8]}") as pool:
+                # Keep only a few tasks queued per thread so a stop takes effect quickly.
+                in_flight = {}
+                while not self._stop.is_set():
+                    while len(in_flight) < self.num_threads * 2:
+                        index = next(pending, None)
+                        if index is None:
+                            break
+                        in_flight[pool.submit(self._evaluate, index)] = index
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        try:
+                            self._record(checkpoint, index, score=future.result())
+                        except Exception as e:
+                            logger.warning(f"Evaluation {self.id} example {index} failed: {e}")
+                            self._record(checkpoint, index, error=str(e))
+                for future in in_flight:
+                    future.cancel()
+        except Exception as e:
+            logger.error(f"Evaluation {self.id} failed: {e}")
+            self.status, self.stop_reason = FAILED, str(e)
+        finally:
+            with self._lock:
+                if self.status == RUNNING:
+                    self.status = STOPPED if self._stop.is_set() else COMPLETED
+                self.finished_at = time.time()
+                self._changed.notify_all()
+
+    def stop(self, reason="Stopped by request."):
+        if not self._stop.is_set():
+            self.stop_reason = reason
+            self._stop.set()
+
+    @property
+    def mean_score(self):
+        return self._score_sum / len(self.scores) if self.scores else 0.0
+
+    def progress(self):
+        with self._lock:
+            done = len(self.scores) + self.errors
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            return {
+                "run_id": self.id,
+                "status": self.status,
+                "stop_reason": self.stop_reason,
+                "total": self.total,
+                "scored": len(self.scores),
+                "errors": self.errors,
+                "resumed": self.resumed,
+                "progress": done / self.total if self.total else 1.0,
+                "mean_score": self.mean_score,
+                "elapsed_seconds": elapsed,
+                "checkpoint": str(self.checkpoint_path),
+            }
+
+    def wait_for_change(self, timeout):
+        """Block until a new example is scored, the run finishes, or timeout passes."""
+        with self._changed:
+            if self.status == RUNNING:
+                self._changed.wait(timeout)
+
+
+class EvaluationManager:
+    """Starts evaluation runs in background threads and keeps them addressable by id."""
+
+    def __init__(self, dspy_manager, checkpoint_dir=EVAL_CHECKPOINT_DIR):
+        self.dspy_manager = dspy_manager
+        self.checkpoint_dir = checkpoint_dir
+        self.runs = {}
+        self._lock = threading.Lock()
+
+    def resolve_metric(self, metric_name=None, metric_module=None, input_keys=DEFAULT_INPUT_KEYS):
+        """Return a built-in metric by name, or a metric function from a registered DSPy module.
+
+        Module metrics follow the DSPy convention and receive each row as a ``dspy.Example``
+        with ``input_keys`` marked as inputs, so ``example.answer`` works as it does in DSPy.
+        """
+        if metric_module:
+            metric = self.dspy_manager.registry.get_function(metric_module, metric_name)
+            if metric is None:
+                raise ValueError(f"Metric function {metric_name} not found in {metric_module}.")
+            import dspy
+            input_keys = tuple(input_keys)
+
+            def dspy_metric(row, prediction):
+                return metric(dspy.Example(**row).with_inputs(*input_keys), prediction)
+
+            return dspy_metric
+        metric_name = metric_name or "exact_match"
+        if metric_name not in BUILTIN_METRICS:
+            raise ValueError(f"Unknown metric '{metric_name}'. Built-in metrics: {', '.join(BUILTIN_METRICS)}.")
+        return BUILTIN_METRICS[metric_name]
+
+    def start(self, module_name, function_name, rows, metric, run_id=None, use_cache=True, **options):
+        """Start (or resume, if run_id has a checkpoint) an evaluation and return the run."""
+        func = self.dspy_manager.get_function(module_name, function_name)
+        if func is None:
+            raise ValueError(f"Function {function_name} not found in {module_name}.")
+        result_cache = self.dspy_manager.result_cache
+        module_info = self.dspy_manager.registry.get_entry(module_name)
+        module_version = self.dspy_manager.registry.module_version(module_name)
+
+        def call(func, kwargs):
+            return result_cache.get_or_call(module_name, function_name, (), kwargs,
+                                            tracked(module_name, function_name, func),
+                                            module_info=module_info, bypass=not use_cache,
+                                            module_version=module_version)
+
+        run_id = run_id or uuid.uuid4().hex
+        with self._lock:
+            existing = self.runs.get(run_id)
+            if existing is not None and existing.status == RUNNING:
+                raise ValueError(f"Evaluation '{run_id}' is already running.")
+            run = EvaluationRun(run_id, func, metric, rows, checkpoint_dir=self.checkpoint_dir, call=call, **options)
+            self.runs[run_id] = run
+        threading.Thread(target=run.run, name=f"evaluation-{run_id[:8]}", daemon=True).start()
+        return run
+
+    def get(self, run_id):
+        return self.runs.get(run_id)
+
+    def shutdown(self, timeout=10.0):
+        """Stop every running evaluation and wait up to ``timeout`` seconds for them to checkpoint."""
+        running = [run for run in list(self.runs.values()) if run.status == RUNNING]
+        for run in running:
+            run.stop("Server shutting down.")
+        deadline = time.monotonic() + timeout
+        for run in running:
+            while run.status == RUNNING and time.monotonic() < deadline:
+                run.wait_for_change(timeout=min(0.5, max(0.0, deadline - time.monotonic())))
+
+    def start_from_config(self, config):
+        """Start an evaluation over the QA dataset store from a request-style config dict.
+
+        The config is saved next to the checkpoint once the run starts. Resuming with only
+        ``run_id`` reuses the saved config, so the split and example indices line up with
+        the checkpoint; a resume whose settings differ from it raises EvaluationConflictError.
+        """
+        from modules.qa_dataset import QADatasetStore
+
+        run_id = validate_run_id(config.get("run_id") or uuid.uuid4().hex)
+        config_path = Path(self.checkpoint_dir) / f"{run_id}.config.json"
+        saved = json.loads(config_path.read_text()) if config_path.exists() else None
+        if saved is not None:
+            changed = sorted(key for key, value in config.items() if key != "run_id" and saved.get(key) != value)
+            if changed:
+                raise EvaluationConflictError(
+                    f"Evaluation '{run_id}' was saved with different settings for: {', '.join(changed)}.")
+            config = saved
+        config = {**config, "run_id": run_id}
+        if not config.get("module_name") or not config.get("function_name"):
+            raise ValueError("module_name and function_name are required.")
+
+        store = QADatasetStore()
+        split = config.get("split", "dev")
+        if split == "all":
+            rows = store.load()
+        else:
+            train, dev = store.split(config.get("dev_fraction", 0.2), config.get("seed", 0))
+            rows = dev if split == "dev" else train
+        if config.get("limit"):
+            rows = rows.select(range(min(config["limit"], len(rows))))
+
+        metric = self.resolve_metric(config.get("metric"), config.get("metric_module"),
+                                     config.get("input_keys") or DEFAULT_INPUT_KEYS)
+        options = {key: config[key] for key in
+                   ("input_keys", "num_threads", "max_errors", "stop_below", "stop_above", "min_examples")
+                   if config.get(key) is not None}
+        run = self.start(config["module_name"], config["function_name"], rows, metric, run_id=run_id,
+                         use_cache=config.get("cache", True), **options)
+        if saved is None:
+            config_path.parent.mkdir(parents=True, exist_ok=True)
+            config_path.write_text(json.dumps(config, indent=2))
+        return run
@@ -0,0 +1,214 @@
+# hot_reload.py
+
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from modules.module_registry import clean_import_path
+
+logger = logging.getLogger(__name__)
+
+HOT_RELOAD = os.getenv("HOT_RELOAD", "false").lower() in ("1", "true", "yes")
+# Extra directories to watch besides the ones holding registered modules.
+HOT_RELOAD_PATHS = [path for path in os.getenv("HOT_RELOAD_PATHS", "modules/dspy").split(os.pathsep) if path]
+HOT_RELOAD_DEBOUNCE = float(os.getenv("HOT_RELOAD_DEBOUNCE", "0.2"))  # Seconds to wait for a burst of saves to settle
+HOT_RELOAD_HISTORY = 100
+
+
+def load_fresh(module_name, path):
+    """Execute the current source of ``path`` into a new module object named ``module_name``.
+
+    The old module object is left untouched, unlike ``importlib.reload``, so functions
+    already handed out keep running against their original globals. Source is compiled
+    directly to avoid a stale .pyc when a file is saved twice within its mtime granularity.
+
+    Like a normal import, the new module is in ``sys.modules`` while its code runs, so
+    dataclasses, pickling and self-imports resolve to it; the old module is put back if
+    execution fails.
+    """
+    old = sys.modules.get(module_name)
+    search_locations = getattr(getattr(old, "__spec__", None), "submodule_search_locations", None)
+    spec = importlib.util.spec_from_file_location(module_name, path, submodule_search_locations=search_locations)
+    module = importlib.util.module_from_spec(spec)
+    with open(path, "rb") as f:
+        code = compile(f.read(), path, "exec")
+    sys.modules[module_name] = module
+    try:
+        exec(code, module.__dict__)
+    except BaseException:
+        if old is not None:
+            sys.modules[module_name] = old
+        else:
+            sys.modules.pop(module_name, None)
+        raise
+    return module
+
+
+class ModuleReloader:
+    """Reloads changed DSPy modules in-process and swaps them into a DSPyManager.
+
+    Only registered modules whose source file changed, plus registered modules that
+    imported from them, are reloaded. Each swap is a single registry state replacement, so new calls
+    see the new version while in-flight calls finish on the old one. A module that
+    fails to load keeps serving its previous version.
+    """
+
+    def __init__(self, dspy_manager, paths=None, debounce=HOT_RELOAD_DEBOUNCE):
+        self.dspy_manager = dspy_manager
+        self.paths = HOT_RELOAD_PATHS if paths is None else paths
+        self.debounce = debounce
+        self.history = deque(maxlen=HOT_RELOAD_HISTORY)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._timer = None
+        self._observer = None
+
+    def _loaded_modules_for(self, path):
+        """Registered modules loaded from ``path``; app modules such as api_endpoints are never reloaded."""
+        candidates = {os.path.abspath(path), os.path.realpath(path)}
+        registered = {clean_import_path(module_info.get("import_path", ""))
+                      for module_info in self.dspy_manager.registry.modules}
+        return [name for name, module in list(sys.modules.items())
+                if name in registered and module is not None and getattr(module, "__file__", None) in candidates]
+
+    def _dependents(self, old_modules):
+        """Registered modules that hold the old modules, or objects defined in them, as globals."""
+        names = {module.__name__ for module in old_modules}
+        registry = self.dspy_manager.registry
+        dependents = set()
+        for registered_name, module in registry.state.module_handles.items():
+            if module.__name__ in names:
+                continue
+            for value in vars(module).values():
+                if any(value is old for old in old_modules) or getattr(value, "__module__", None) in names:
+                    dependents.add(module.__name__)
+                    break
+        return dependents
+
+    def reload_paths(self, paths):
+        """Reload the registered modules backed by ``paths`` and their dependents. Returns a report dict.
+
+        Paths that do not back a loaded registered module are listed under "ignored".
+        """
+        started = time.perf_counter()
+        report = {"at": time.time(), "files": sorted(paths), "reloaded": [], "swapped": [], "errors": {},
+                  "ignored": []}
+        with self._lock:
+            targets = {}
+            for path in paths:
+                module_names = self._loaded_modules_for(path)
+                if not module_names:
+                    report["ignored"].append(path)
+                for module_name in module_names:
+                    targets[module_name] = path
+            old_modules = [sys.modules[name] for name in targets]
+            for module_name in self._dependents(old_modules):
+                targets.setdefault(module_name, sys.modules[module_name].__file__)
+
+            # Changed files first, then the modules that import from them.
+            for module_name, path in sorted(targets.items(), key=lambda item: item[1] not in paths):
+                try:
+                    module = load_fresh(module_name, path)
+                except Exception as e:
+                    logger.error(f"Reload of {module_name} failed; keeping the previous version. Details: {e}")
+                    report["errors"][module_name] = f"{type(e).__name__}: {e}"
+                    continue
+                sys.modules[module_name] = module
+                parent_name, _, child = module_name.rpartition(".")
+                if parent_name in sys.modules:
+                    setattr(sys.modules[parent_name], child, module)
+                report["reloaded"].append(module_name)
+                for registered_name in self.dspy_manager.registry.names_for_import_path(module_name):
+                    self.dspy_manager.swap_module(registered_name, module)
+                    report["swapped"].append(registered_name)
+        report["seconds"] = time.perf_counter() - started
+        self.history.append(report)
+        if report["reloaded"] or report["errors"]:
+            logger.info(f"Reloaded {', '.join(report['reloaded']) or 'nothing'} in {report['seconds'] * 1000:.1f} ms"
+                        f"{' with errors' if report['errors'] else ''}.")
+        return report
+
+    def reload_module(self, module_name):
+        """Reload one registered module by name, whether or not its file changed."""
+        module = self.dspy_manager.registry.get_module(module_name)
+        if module is None:
+            raise ValueError(f"Module '{module_name}' is not registered.")
+        return self.reload_paths([module.__file__])
+
+    def notify(self, path):
+        """Queue a changed file; the reload runs once saves have settled for ``debounce`` seconds."""
+        if not path.endswith(".py"):
+            return
+        with self._pending_lock:
+            self._pending.add(os.path.abspath(path))
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        with self._pending_lock:
+            paths, self._pending = self._pending, set()
+            self._timer = None
+        if paths:
+            try:
+                self.reload_paths(paths)
+            except Exception as e:
+                logger.error(f"Hot reload failed: {e}")
+
+    def watched_directories(self):
+        directories = {os.path.abspath(path) for path in self.paths if os.path.isdir(path)}
+        for module_info in self.dspy_manager.registry.modules:
+            # Locate registered modules without importing them (parent packages may be imported).
+            try:
+                spec = importlib.util.find_spec(clean_import_path(module_info.get("import_path", "")))
+            except (ImportError, ValueError):
+                continue
+            if spec is not None and spec.origin and os.path.isfile(spec.origin):
+                directories.add(os.path.dirname(os.path.abspath(spec.origin)))
+        # Drop directories already covered by a watched parent.
+        return sorted(d for d in directories if not any(d != p and d.startswith(p + os.sep) for p in directories))
+
+    def start(self):
+        """Start watching for source changes with watchdog."""
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        reloader = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in ("modified", "created", "moved"):
+                    return
+                reloader.notify(getattr(event, "dest_path", None) or event.src_path)
+
+        self._observer = Observer()
+        for directory in self.watched_directories():
+            self._observer.schedule(Handler(), directory, recursive=True)
+            logger.info(f"Hot reload watching {directory}")
+        self._observer.daemon = True
+        self._observer.start()
+        return self
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def stats(self):
+        latencies = sorted(report["seconds"] for report in self.history if report["reloaded"])
+        return {
+            "watching": self._observer is not None,
+            "reloads": len(latencies),
+            "last_seconds": self.history[-1]["seconds"] if self.history else None,
+            "p50_seconds": latencies[len(latencies) // 2] if latencies else None,
+            "max_seconds": latencies[-1] if latencies else None,
+            "history": list(self.history)[-10:],
+        }
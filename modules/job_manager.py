@@ -0,0 +1,165 @@
+# job_manager.py
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))  # Max jobs waiting for a worker
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "1000"))  # Finished jobs kept for status/result lookups
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the wait queue is at capacity."""
+
+
+class Job:
+    def __init__(self, job_id, module_name, function_name, args, kwargs, use_cache=True):
+        self.id = job_id
+        self.module_name = module_name
+        self.function_name = function_name
+        self.args = args
+        self.kwargs = kwargs
+        self.use_cache = use_cache
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    def to_dict(self, include_result=False):
+        data = {
+            "job_id": self.id,
+            "module_name": self.module_name,
+            "function_name": self.function_name,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result and self.status == SUCCEEDED:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """Runs DSPy function calls on a bounded thread pool and tracks them by job id."""
+
+    def __init__(self, dspy_manager, max_workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, retention=JOB_RETENTION):
+        self.dspy_manager = dspy_manager
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dspy-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    def submit(self, module_name, function_name, args=None, kwargs=None, use_cache=True):
+        """Queue a function call and return its Job; raises QueueFullError at capacity."""
+        job = Job(uuid.uuid4().hex, module_name, function_name, list(args or []), dict(kwargs or {}), use_cache)
+        with self._lock:
+            if self._queued >= self.max_queue:
+                raise QueueFullError(f"Job queue is full ({self.max_queue} jobs waiting).")
+            self._queued += 1
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        with self._lock:
+            self._queued -= 1
+            if job.status == CANCELLED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._running += 1
+        try:
+            result = self.dspy_manager.run_function(job.module_name, job.function_name, job.args, job.kwargs,
+                                                    use_cache=job.use_cache)
+            if result is None:
+                job.status, job.error = FAILED, "Execution failed."
+            else:
+                job.status, job.result = SUCCEEDED, result
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status, job.error = FAILED, f"Execution error. Details: {str(e)}"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit. Caller holds the lock."""
+        excess = len(self._jobs) - self.retention
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued job. Returns the Job, or None if unknown; running jobs are not interrupted."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                if job.future is not None and job.future.cancel():
+                    # The worker will never pick it up, so release its queue slot here.
+                    self._queued -= 1
+            return job
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "queue_depth": self._queued,
+                "running": self._running,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "jobs": counts,
+            }
+
+    def shutdown(self, wait=True, timeout=None):
+        """Cancel queued jobs and wait up to ``timeout`` seconds for running ones.
+
+        Returns the number of jobs still running when the wait ended.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == QUEUED and job.future is not None and job.future.cancel():
+                    job.status, job.error = CANCELLED, "Server shutting down."
+                    job.finished_at = time.time()
+                    self._queued -= 1
+            # Includes jobs a worker has picked up but not yet marked running.
+            pending = [job.future for job in self._jobs.values()
+                       if job.status not in FINISHED_STATES and job.future is not None]
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if not wait or not pending:
+            return 0
+        _, not_done = futures_wait(pending, timeout=timeout)
+        if not_done:
+            logger.warning(f"{len(not_done)} jobs still running at the shutdown deadline.")
+        return len(not_done)
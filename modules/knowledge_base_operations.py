@@ -1,5 +1,8 @@
-import subprocess
 import json
+import psycopg2
+from psycopg2.extras import execute_values
+from modules.metrics import db_call
+from modules.postgres_pool import get_cursor
 from modules.add_context_folder import add_context_folder  # Import the function from add_context_folder.py
 
 # Main entry point for Knowledge Management
@@ -14,9 +17,10 @@ def knowledge_management_menu():
         print("4. Delete Knowledge Entry")
         print("5. Add File to Knowledge Collection")
         print("6. Add Context Folder to Knowledge Base")
-        print("7. Back to Main Menu")
+        print("7. Bulk Load Knowledge Entries from File")
+        print("8. Back to Main Menu")
         
-        choice = input("Enter your choice (1-7): ")
+        choice = input("Enter your choice (1-8): ")
 
         if choice == '1':
             title = input("Enter title for the knowledge entry: ")
@@ -45,6 +49,10 @@ def knowledge_management_menu():
             add_context_folder(repo_url)
 
         elif choice == '7':
+            file_path = input("Enter the path of a JSON or JSON-lines file of entries: ").strip()
+            load_knowledge_entries_from_file(file_path)
+
+        elif choice == '8':
             print("Returning to Main Menu.")
             break
 
@@ -52,17 +60,19 @@ def knowledge_management_menu():
             print("Invalid choice. Please try again.")
 
 # Supporting Functions
-def execute_query(query):
-    """Helper function to execute PostgreSQL commands."""
+def execute_query(query, params=None):
+    """Helper function to execute a parameterized PostgreSQL statement on a pooled connection.
+
+    Returns the rows as a list of dicts for statements that produce rows, otherwise the
+    number of affected rows. Returns None if the statement fails.
+    """
     try:
-        command = [
-            "docker", "exec", "mw-postgres",
-            "psql", "-U", "myuser", "-d", "animals",
-            "-c", query
-        ]
-        result = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True)
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
+        with db_call("postgres", "execute_query"), get_cursor() as cursor:
+            cursor.execute(query, params)
+            if cursor.description is not None:
+                return [dict(row) for row in cursor.fetchall()]
+            return cursor.rowcount
+    except psycopg2.Error as e:
         print(f"Error executing query: {e}")
         return None
 
@@ -75,24 +85,68 @@ def add_knowledge_entry(entry):
         print("Both title and content are required to add a knowledge entry.")
         return
 
-    query = f"INSERT INTO knowledge_base (title, content) VALUES ('{title}', '{content}');"
-    execute_query(query)
-    print(f"Successfully added knowledge entry: {title}")
+    query = "INSERT INTO knowledge_base (title, content) VALUES (%s, %s);"
+    if execute_query(query, (title, content)) is not None:
+        print(f"Successfully added knowledge entry: {title}")
+
+def add_knowledge_entries(entries, page_size=1000):
+    """Insert many entries with multi-row INSERT statements. Returns the number inserted."""
+    rows = [(entry.get('title'), entry.get('content')) for entry in entries]
+    skipped = sum(1 for title, content in rows if not title or not content)
+    rows = [(title, content) for title, content in rows if title and content]
+    if skipped:
+        print(f"Skipping {skipped} entries without both title and content.")
+    if not rows:
+        return 0
+
+    try:
+        with db_call("postgres", "bulk_insert"), get_cursor() as cursor:
+            execute_values(
+                cursor, "INSERT INTO knowledge_base (title, content) VALUES %s;", rows, page_size=page_size
+            )
+    except psycopg2.Error as e:
+        print(f"Error bulk inserting knowledge entries: {e}")
+        return 0
+    print(f"Successfully added {len(rows)} knowledge entries.")
+    return len(rows)
+
+def load_knowledge_entries_from_file(file_path):
+    """Bulk load entries from a JSON array or JSON-lines file of {title, content} objects."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError as e:
+        print(f"Could not read file '{file_path}': {e}")
+        return 0
+
+    try:
+        entries = json.loads(text)
+        if isinstance(entries, dict):
+            entries = [entries]
+    except json.JSONDecodeError:
+        try:
+            entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            print(f"File '{file_path}' is neither JSON nor JSON-lines: {e}")
+            return 0
+    return add_knowledge_entries(entries)
 
 def view_knowledge_base():
     """View all entries in the knowledge base."""
-    query = "SELECT * FROM knowledge_base;"
-    result = execute_query(query)
-    if result:
+    query = "SELECT * FROM knowledge_base ORDER BY id;"
+    rows = execute_query(query)
+    if rows:
         print("Knowledge Base Entries:")
-        print(result)
+        for row in rows:
+            print(f"{row.get('id')}: {row.get('title')} - {row.get('content')}")
     else:
         print("No entries found in the knowledge base.")
+    return rows or []
 
 def update_knowledge_entry(entry_id, new_content):
     """Update an existing entry in the knowledge base."""
-    query = f"UPDATE knowledge_base SET content = '{new_content}' WHERE id = {entry_id};"
-    result = execute_query(query)
+    query = "UPDATE knowledge_base SET content = %s WHERE id = %s;"
+    result = execute_query(query, (new_content, entry_id))
     if result:
         print(f"Successfully updated entry with ID: {entry_id}")
     else:
@@ -100,8 +154,8 @@ def update_knowledge_entry(entry_id, new_content):
 
 def delete_knowledge_entry(entry_id):
     """Delete an entry from the knowledge base by ID."""
-    query = f"DELETE FROM knowledge_base WHERE id = {entry_id};"
-    result = execute_query(query)
+    query = "DELETE FROM knowledge_base WHERE id = %s;"
+    result = execute_query(query, (entry_id,))
     if result:
         print(f"Successfully deleted entry with ID: {entry_id}")
     else:
@@ -0,0 +1,170 @@
+# knowledge_writer.py
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from modules.metrics import db_call
+from modules.neo4j_manager import get_driver
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_FLUSH_SIZE = int(os.getenv("KNOWLEDGE_FLUSH_SIZE", "500"))  # Flush once this many triples are buffered
+KNOWLEDGE_FLUSH_INTERVAL = float(os.getenv("KNOWLEDGE_FLUSH_INTERVAL", "2.0"))  # Or after this many seconds
+KNOWLEDGE_MAX_BUFFER = int(os.getenv("KNOWLEDGE_MAX_BUFFER", "20000"))  # Reject new triples beyond this
+
+RELATIONSHIP_PATTERN = re.compile(r"^[A-Z_][A-Z0-9_]*$")
+
+# Relationship types cannot be query parameters, so one UNWIND runs per validated type.
+MERGE_TRIPLES_QUERY = (
+    "UNWIND $rows AS row "
+    "MERGE (s:Entity {{name: row.subject}}) "
+    "MERGE (o:Entity {{name: row.object}}) "
+    "MERGE (s)-[:{relationship}]->(o)"
+)
+
+
+class BufferFullError(Exception):
+    """Raised when accepting triples would exceed the writer's buffer capacity."""
+
+
+def normalize_triple(subject, relationship, obj):
+    """Normalize a triple the way /add_knowledge always has; raises ValueError if invalid."""
+    if not subject or not relationship or not obj:
+        raise ValueError("All fields (subject, relationship, object) are required.")
+    relationship = re.sub(r"\s+", "_", relationship.strip()).upper()
+    if not RELATIONSHIP_PATTERN.match(relationship):
+        raise ValueError(f"Invalid relationship type '{relationship}'.")
+    return subject.title(), relationship, obj.title()
+
+
+class KnowledgeWriter:
+    """Buffers knowledge triples and writes them to Neo4j in batched transactions.
+
+    A background thread flushes whenever ``flush_size`` triples are pending or
+    ``flush_interval`` seconds have passed. Each flush is a single transaction
+    with one ``UNWIND ... MERGE`` statement per relationship type.
+    """
+
+    def __init__(self, flush_size=KNOWLEDGE_FLUSH_SIZE, flush_interval=KNOWLEDGE_FLUSH_INTERVAL,
+                 max_buffer=KNOWLEDGE_MAX_BUFFER, driver_factory=get_driver):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.driver_factory = driver_factory
+        self._buffer = []
+        self._in_flight = 0  # Triples taken by a flush that is still writing; they count against max_buffer
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_at = None
+        self.last_flush_seconds = None
+        self.last_error = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="knowledge-writer", daemon=True)
+            self._thread.start()
+
+    def add(self, triples):
+        """Buffer normalized (subject, relationship, object) triples; all or nothing.
+
+        Returns the number of triples not yet written, including any a flush is writing.
+        """
+        with self._cond:
+            pending = len(self._buffer) + self._in_flight
+            if pending + len(triples) > self.max_buffer:
+                raise BufferFullError(
+                    f"Knowledge buffer is full ({pending}/{self.max_buffer} triples pending)."
+                )
+            self._buffer.extend(triples)
+            self._ensure_thread()
+            if len(self._buffer) >= self.flush_size:
+                self._cond.notify()
+            return pending + len(triples)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # After a failed flush, back off for an interval instead of retrying in a tight loop.
+                if not self._stopped and (len(self._buffer) < self.flush_size or self.last_error):
+                    self._cond.wait(self.flush_interval)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+
+    def flush(self):
+        """Write everything currently buffered. Returns the number of triples written."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+                self._in_flight = len(batch)
+            if not batch:
+                return 0
+            by_relationship = defaultdict(list)
+            for subject, relationship, obj in batch:
+                by_relationship[relationship].append({"subject": subject, "object": obj})
+
+            started = time.perf_counter()
+            try:
+                with db_call("neo4j", "merge_triples"), self.driver_factory().session() as session:
+                    session.execute_write(self._write_batch, by_relationship)
+            except Exception as e:
+                # Put the batch back in front so nothing is lost; the next flush retries it.
+                with self._cond:
+                    self._buffer = batch + self._buffer
+                    self._in_flight = 0
+                self.failed_flushes += 1
+                self.last_error = str(e)
+                logger.error(f"Failed to flush {len(batch)} knowledge triples: {e}")
+                return 0
+
+            with self._cond:
+                self._in_flight = 0
+            self.written += len(batch)
+            self.flushes += 1
+            self.last_flush_at = time.time()
+            self.last_flush_seconds = time.perf_counter() - started
+            self.last_error = None
+            logger.info(f"Flushed {len(batch)} knowledge triples in {self.last_flush_seconds:.3f}s")
+            return len(batch)
+
+    @staticmethod
+    def _write_batch(tx, by_relationship):
+        for relationship, rows in by_relationship.items():
+            tx.run(MERGE_TRIPLES_QUERY.format(relationship=relationship), rows=rows)
+
+    def status(self):
+        with self._cond:
+            pending = len(self._buffer) + self._in_flight
+        return {
+            "pending": pending,
+            "max_buffer": self.max_buffer,
+            "capacity_remaining": self.max_buffer - pending,
+            "flush_size": self.flush_size,
+            "flush_interval": self.flush_interval,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_at": self.last_flush_at,
+            "last_flush_seconds": self.last_flush_seconds,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        """Stop the background thread after flushing what is left."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
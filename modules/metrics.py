@@ -0,0 +1,305 @@
+# metrics.py
+
+import logging
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base for metrics whose values are kept in per-thread shards.
+
+    Each thread writes only to its own dict, so recording never takes a lock; the
+    scrape sums the shards. Shards of threads that have exited are folded into a
+    shared total when a new thread registers or on scrape, so per-request threads
+    do not leave a shard behind each, and totals never go backwards.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # (weak reference to the owning thread, shard)
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._retire_dead_shards()
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+        return shard
+
+    def _retire_dead_shards(self):
+        """Fold shards of exited threads into the retired total. Caller holds the shards lock."""
+        live = []
+        for thread_ref, shard in self._shards:
+            thread = thread_ref()
+            if thread is not None and thread.is_alive():
+                live.append((thread_ref, shard))
+                continue
+            for key, value in list(shard.items()):
+                self._retired[key] = self._merge(self._retired.get(key), value)
+        self._shards = live
+
+    def _merge(self, total, value):
+        raise NotImplementedError
+
+    def _snapshot(self):
+        with self._shards_lock:
+            self._retire_dead_shards()
+            shards = [shard for _, shard in self._shards]
+            entries = list(self._retired.items())
+        return entries + [(key, value) for shard in shards for key, value in list(shard.items())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+    def collect(self):
+        totals = {}
+        for key, value in self._snapshot():
+            totals[key] = totals.get(key, 0) + value
+        return [(self.name, key, (), value) for key, value in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    """Up/down gauge (in-flight counts) built on sharded sums; ``set`` is for single-writer values."""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        with self._shards_lock:
+            for _, shard in self._shards:
+                shard.pop(labels, None)
+            self._retired.pop(labels, None)
+        shard = self._shard()
+        shard[labels] = value
+
+    @contextmanager
+    def track(self, *labels):
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def _merge(self, total, value):
+        counts, value_sum, count = value
+        if total is None:
+            return [list(counts), value_sum, count]
+        for index, bucket_count in enumerate(counts):
+            total[0][index] += bucket_count
+        total[1] += value_sum
+        total[2] += count
+        return total
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def collect(self):
+        merged = {}
+        for key, (counts, total, count) in self._snapshot():
+            entry = merged.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            for index, bucket_count in enumerate(counts):
+                entry[0][index] += bucket_count
+            entry[1] += total
+            entry[2] += count
+        samples = []
+        for key, (counts, total, count) in sorted(merged.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f"{self.name}_bucket", key, (("le", le),), cumulative))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors, and renders the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def register_collector(self, collector):
+        """Add a callable returning [(name, type, help, labels dict, value)] evaluated at scrape time."""
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, extra, value in metric.collect():
+                lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} {value}")
+        declared = set()
+        for collector in self.collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, documentation, labels, value in samples:
+                if value is None:
+                    continue
+                if name not in declared:
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    declared.add(name)
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                                 ("route", "method", "status"))
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+DSPY_FUNCTION_SECONDS = Histogram("dspy_function_duration_seconds", "DSPy function execution time.",
+                                  ("module", "function"))
+DSPY_FUNCTION_ERRORS = Counter("dspy_function_errors_total", "DSPy function calls that raised.", ("module", "function"))
+DSPY_FUNCTIONS_IN_FLIGHT = Gauge("dspy_functions_in_flight", "DSPy function calls currently running.", ("module",))
+DSPY_MODULE_IMPORT_SECONDS = Gauge("dspy_module_import_seconds", "Time taken by the last import of each DSPy module.",
+                                   ("module",))
+DB_CALL_SECONDS = Histogram("db_call_duration_seconds", "Database call latency.", ("db", "operation"))
+DB_CALL_ERRORS = Counter("db_call_errors_total", "Database calls that raised.", ("db", "operation"))
+
+
+@contextmanager
+def track_function(module_name, function_name):
+    """Time one DSPy function call, counting errors and in-flight calls."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    DSPY_FUNCTIONS_IN_FLIGHT.inc(module_name)
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DSPY_FUNCTION_ERRORS.inc(module_name, function_name)
+        raise
+    finally:
+        DSPY_FUNCTION_SECONDS.observe(time.perf_counter() - started, module_name, function_name)
+        DSPY_FUNCTIONS_IN_FLIGHT.dec(module_name)
+
+
+def tracked(module_name, function_name, func):
+    """Wrap ``func`` so each real execution is tracked; hand this to the result cache so hits are not counted."""
+    if not METRICS_ENABLED:
+        return func
+
+    def call(*args, **kwargs):
+        with track_function(module_name, function_name):
+            return func(*args, **kwargs)
+
+    return call
+
+
+@contextmanager
+def db_call(db, operation):
+    """Time one database call, counting it as an error if it raises."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        DB_CALL_ERRORS.inc(db, operation)
+        raise
+    finally:
+        DB_CALL_SECONDS.observe(time.perf_counter() - started, db, operation)
+
+
+def instrument_flask(app):
+    """Record per-route latency and in-flight requests for a Flask app."""
+    if not METRICS_ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _observe(exc):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        # The URL rule, not the raw path, keeps label cardinality bounded.
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        status = 500 if exc is not None else g.pop("_metrics_status", 500)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, str(status))
+
+
+def render():
+    return REGISTRY.render()
@@ -0,0 +1,265 @@
+# module_registry.py
+
+import hashlib
+import importlib
+import logging
+import os
+import pickle
+import threading
+import time
+
+import yaml
+
+from modules.metrics import DSPY_MODULE_IMPORT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+YAML_PATH = os.getenv("YAML_PATH", "dspy_modules.yaml")
+# Minimum number of seconds between on-disk checks of the YAML file.
+YAML_CHECK_INTERVAL = float(os.getenv("YAML_CHECK_INTERVAL", "1.0"))
+# Pickled copy of the parsed YAML, reused while the YAML content hash matches. Defaults to
+# "<yaml_path>.snapshot"; an empty string disables it.
+REGISTRY_SNAPSHOT_PATH = os.getenv("REGISTRY_SNAPSHOT_PATH")
+SNAPSHOT_VERSION = 1
+
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class RegistryState:
+    """Immutable-by-convention view of one parsed version of the YAML file."""
+
+    def __init__(self, modules, digest=None):
+        self.modules = modules
+        self.digest = digest
+        self.index = {}
+        for module_info in modules:
+            name = module_info.get("name")
+            if name is not None and name not in self.index:
+                self.index[name] = module_info
+        self.module_handles = {}
+        self.function_handles = {}
+        self.function_names = {}
+        self.module_versions = {}
+
+    def with_module(self, module_name, module):
+        """Return a copy of this state with ``module_name`` bound to a new module object."""
+        state = RegistryState.__new__(RegistryState)
+        state.modules, state.digest, state.index = self.modules, self.digest, self.index
+        state.module_handles = {**self.module_handles, module_name: module}
+        state.function_handles = {key: func for key, func in self.function_handles.items() if key[0] != module_name}
+        state.function_names = {name: funcs for name, funcs in self.function_names.items() if name != module_name}
+        state.module_versions = {name: version for name, version in self.module_versions.items() if name != module_name}
+        return state
+
+
+def clean_import_path(import_path):
+    """Strip inline annotations such as '# Updated to working path' from an import path."""
+    return import_path.split("#", 1)[0].strip()
+
+
+class ModuleRegistry:
+    """Name-indexed registry of DSPy modules with cached module and function handles.
+
+    The YAML file is re-checked at most every ``check_interval`` seconds. A change in
+    mtime or size triggers a content hash comparison, and only a real content change
+    drops the cached handles.
+    """
+
+    def __init__(self, yaml_path=YAML_PATH, check_interval=YAML_CHECK_INTERVAL, snapshot_path=REGISTRY_SNAPSHOT_PATH):
+        self.yaml_path = yaml_path
+        self.check_interval = check_interval
+        self.snapshot_path = f"{yaml_path}.snapshot" if snapshot_path is None else snapshot_path
+        self.last_load = None
+        self._lock = threading.RLock()
+        self._stat = None
+        self._last_check = 0.0
+        self._state = RegistryState([])
+        self.refresh(force=True)
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.yaml_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_snapshot(self, digest):
+        if not self.snapshot_path:
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as file:
+                snapshot = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable registry snapshot {self.snapshot_path}: {e}")
+            return None
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("digest") != digest:
+            return None
+        return snapshot["modules"]
+
+    def _write_snapshot(self, modules, digest):
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                pickle.dump({"version": SNAPSHOT_VERSION, "digest": digest, "modules": modules}, file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not write registry snapshot {self.snapshot_path}: {e}")
+
+    def _load(self):
+        """Read and parse the YAML file, returning (modules, digest).
+
+        A snapshot whose digest matches the YAML content is used instead of parsing.
+        """
+        started = time.perf_counter()
+        try:
+            with open(self.yaml_path, "rb") as file:
+                raw = file.read()
+        except FileNotFoundError:
+            logger.error(f"YAML file not found at {self.yaml_path}")
+            self.last_load = None
+            return [], None
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest == self._state.digest:
+            return None, digest
+        modules = self._read_snapshot(digest)
+        source = "snapshot"
+        if modules is None:
+            source = "yaml"
+            try:
+                dspy_data = yaml.load(raw, Loader=_YamlLoader) or {}
+            except yaml.YAMLError as e:
+                logger.error(f"Failed to parse YAML file at {self.yaml_path}. Details: {e}")
+                self.last_load = None
+                return [], digest
+            modules = dspy_data.get("dspy_modules", []) or []
+            self._write_snapshot(modules, digest)
+        self.last_load = {"source": source, "seconds": time.perf_counter() - started, "modules": len(modules)}
+        return modules, digest
+
+    def refresh(self, force=False):
+        """Reload the registry if the YAML file changed on disk. Returns True if reloaded."""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        with self._lock:
+            self._last_check = now
+            stat = self._file_stat()
+            if not force and stat == self._stat:
+                return False
+            self._stat = stat
+            modules, digest = self._load()
+            if modules is None:
+                # Touched but unchanged: keep the warm handles.
+                return False
+            self._state = RegistryState(modules, digest)
+            if self.last_load is not None:
+                logger.info(f"Loaded {len(modules)} DSPy module entries from {self.yaml_path} "
+                            f"({self.last_load['source']}, {self.last_load['seconds'] * 1000:.1f} ms)")
+            return True
+
+    def swap_module(self, module_name, module):
+        """Atomically point ``module_name`` at a freshly loaded module.
+
+        Callers that already hold the old module or its functions keep using them, so
+        in-flight calls finish on the version they started with.
+        """
+        with self._lock:
+            self._state = self._state.with_module(module_name, module)
+
+    def names_for_import_path(self, import_path):
+        """Registered names whose entry imports ``import_path``."""
+        return [name for name, module_info in self._state.index.items()
+                if clean_import_path(module_info.get("import_path", "")) == import_path]
+
+    def invalidate(self):
+        """Drop all cached handles and re-read the YAML file."""
+        with self._lock:
+            self._state = RegistryState([])
+            self.refresh(force=True)
+
+    @property
+    def state(self):
+        self.refresh()
+        return self._state
+
+    @property
+    def modules(self):
+        """The list of module metadata entries from the YAML file."""
+        return self.state.modules
+
+    def get_entry(self, module_name):
+        """Return the YAML entry for ``module_name`` or None."""
+        return self.state.index.get(module_name)
+
+    def get_module(self, module_name):
+        """Return the imported module for ``module_name``, importing it on first use.
+
+        Returns None if the name is not registered; import errors propagate.
+        """
+        state = self.state
+        module = state.module_handles.get(module_name)
+        if module is not None:
+            return module
+        module_info = state.index.get(module_name)
+        if module_info is None:
+            return None
+        started = time.perf_counter()
+        module = importlib.import_module(clean_import_path(module_info["import_path"]))
+        DSPY_MODULE_IMPORT_SECONDS.set(module_name, value=time.perf_counter() - started)
+        state.module_handles[module_name] = module
+        return module
+
+    def get_function(self, module_name, function_name):
+        """Return the callable ``function_name`` from ``module_name`` or None."""
+        state = self.state
+        key = (module_name, function_name)
+        func = state.function_handles.get(key)
+        if func is not None:
+            return func
+        module = self.get_module(module_name)
+        if module is None:
+            return None
+        func = getattr(module, function_name, None)
+        if not callable(func):
+            return None
+        state.function_handles[key] = func
+        return func
+
+    def module_version(self, module_name):
+        """Return a short hash of the source file behind ``module_name``'s loaded module.
+
+        The hash is taken once per loaded module, so it changes when a reload or a restart
+        picks up edited code. Returns None if the module is unregistered or has no file.
+        """
+        state = self.state
+        if module_name in state.module_versions:
+            return state.module_versions[module_name]
+        module = self.get_module(module_name)
+        path = getattr(module, "__file__", None)
+        version = None
+        if path:
+            try:
+                with open(path, "rb") as file:
+                    version = hashlib.sha256(file.read()).hexdigest()[:16]
+            except OSError as e:
+                logger.warning(f"Could not hash {path} for {module_name}: {e}")
+        state.module_versions[module_name] = version
+        return version
+
+    def list_functions(self, module_name):
+        """Return the public callables of ``module_name``; an empty list if unavailable."""
+        state = self.state
+        functions = state.function_names.get(module_name)
+        if functions is not None:
+            return functions
+        module = self.get_module(module_name)
+        if module is None:
+            return []
+        functions = [func for func in dir(module) if callable(getattr(module, func)) and not func.startswith("__")]
+        state.function_names[module_name] = functions
+        return functions
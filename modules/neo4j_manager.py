@@ -1,27 +1,72 @@
 # neo4j_manager.py
 
+import os
 import subprocess
-import time
-import requests
+import threading
+
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "default_password")
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "30"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+
+_drivers = {}
+_driver_lock = threading.Lock()
+
+def get_driver(uri=None, user=None, password=None):
+    """Return the process-wide Neo4j driver for a URI and user, creating it on first use.
+
+    Each driver keeps its own connection pool, so every caller with the same
+    settings shares one set of connections.
+    """
+    key = (uri or NEO4J_URI, user or NEO4J_USER, password or NEO4J_PASSWORD)
+    driver = _drivers.get(key)
+    if driver is None:
+        with _driver_lock:
+            driver = _drivers.get(key)
+            if driver is None:
+                from neo4j import GraphDatabase
+                driver = GraphDatabase.driver(
+                    key[0], auth=(key[1], key[2]),
+                    max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                    connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+                    connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                )
+                _drivers[key] = driver
+    return driver
+
+def close_drivers():
+    """Close every shared Neo4j driver, e.g. at process shutdown."""
+    with _driver_lock:
+        for driver in _drivers.values():
+            driver.close()
+        _drivers.clear()
 
 class Neo4jManager:
     def __init__(self, container_name="neo4j"):
         self.container_name = container_name
 
+    @property
+    def driver(self):
+        """The shared Neo4j driver."""
+        return get_driver()
+
+    def ensure_role_index(self):
+        """Index Role names so role upserts can MERGE without a label scan."""
+        with self.driver.session() as session:
+            session.run("CREATE INDEX role_name IF NOT EXISTS FOR (r:Role) ON (r.name)").consume()
+
     def run_initial_setup(self):
         """Run any required setup for Neo4j after it starts."""
-        neo4j_url = "http://localhost:7474"
+        import asyncio
+        from modules.container_bringup import http_probe, wait_ready
+
         timeout = 60  # 60 seconds timeout for health check
 
-        # Check Neo4j health status
-        for _ in range(timeout):
-            try:
-                response = requests.get(neo4j_url)
-                if response.status_code == 200:
-                    print("Neo4j is ready.")
-                    break
-            except requests.ConnectionError:
-                time.sleep(1)
+        # Check Neo4j health status, backing off between attempts that each time out quickly
+        if asyncio.run(wait_ready(lambda: http_probe("localhost", 7474), timeout)):
+            print("Neo4j is ready.")
         else:
             print("Neo4j did not become ready in time.")
             return
@@ -36,3 +81,8 @@ class Neo4jManager:
             print("Neo4j setup complete with initial data/constraints.")
         except subprocess.CalledProcessError as e:
             print(f"Failed to run initialization script for Neo4j: {e}")
+
+        try:
+            self.ensure_role_index()
+        except Exception as e:
+            print(f"Failed to create Role name index in Neo4j: {e}")
@@ -0,0 +1,346 @@
+# ollama_client.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", f"http://localhost:{os.getenv('OLLAMA_PORT', '11434')}")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+LM_CACHE_DIR = os.getenv("LM_CACHE_DIR", "lm_cache")  # Empty string keeps the LM cache in memory only
+LM_CACHE_MAX_ENTRIES = int(os.getenv("LM_CACHE_MAX_ENTRIES", "4096"))
+LM_CACHE_TTL = float(os.getenv("LM_CACHE_TTL", "0"))  # Seconds; 0 keeps responses until evicted
+OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "16"))  # Keep-alive connections to the model server
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "8"))  # Requests in flight at once
+OLLAMA_MAX_WAITING = int(os.getenv("OLLAMA_MAX_WAITING", "64"))  # Requests allowed to queue for a slot
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "30"))  # Seconds a request may wait for a slot
+OLLAMA_EMBED_BATCH_SIZE = int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", "64"))  # 0 or 1 disables micro-batching
+OLLAMA_EMBED_BATCH_WINDOW = float(os.getenv("OLLAMA_EMBED_BATCH_WINDOW", "0.01"))  # Seconds to gather a batch
+
+# Request fields that do not change the model's output and so stay out of the cache key.
+UNKEYED_FIELDS = ("stream", "keep_alive")
+
+
+def lm_cache_key(endpoint, payload):
+    """Stable key over the endpoint, model, prompt/messages and every sampling option."""
+    keyed = {k: v for k, v in payload.items() if k not in UNKEYED_FIELDS}
+    return hashlib.sha256(json.dumps([endpoint, keyed], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class OllamaOverloadedError(Exception):
+    """Raised when the wait queue for the model server is full or a request waited too long."""
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests, with a bounded wait queue that rejects instead of piling up."""
+
+    def __init__(self, max_concurrency=OLLAMA_MAX_CONCURRENCY, max_waiting=OLLAMA_MAX_WAITING,
+                 timeout=OLLAMA_QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def acquire(self):
+        with self._cond:
+            if self.active < self.max_concurrency:
+                self.active += 1
+                return
+            if self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise OllamaOverloadedError(
+                    f"Ollama request queue is full ({self.waiting} waiting, {self.active} in flight)."
+                )
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while self.active >= self.max_concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise OllamaOverloadedError(f"Timed out after {self.timeout}s waiting for an Ollama slot.")
+                    self._cond.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_waiting": self.max_waiting,
+        }
+
+
+class _Batch:
+    __slots__ = ("texts", "full", "done", "closed", "result", "error")
+
+    def __init__(self):
+        self.texts = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.closed = False
+        self.result = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    """Merges concurrent embedding requests for one model into a single /api/embed call.
+
+    The first caller opens a batch and waits up to ``window`` seconds (or until
+    ``max_batch`` inputs arrive) for others to join, then sends one request and hands
+    each caller its slice of the returned embeddings.
+    """
+
+    def __init__(self, send, max_batch=OLLAMA_EMBED_BATCH_SIZE, window=OLLAMA_EMBED_BATCH_WINDOW):
+        self.send = send
+        self.max_batch = max_batch
+        self.window = window
+        self._lock = threading.Lock()
+        self._open = {}
+        self.batches_sent = 0
+        self.inputs_batched = 0
+
+    def embed(self, model, texts):
+        with self._lock:
+            batch = self._open.get(model)
+            leader = batch is None or batch.closed or len(batch.texts) + len(texts) > self.max_batch
+            if leader:
+                batch = self._open[model] = _Batch()
+            start = len(batch.texts)
+            batch.texts.extend(texts)
+            end = len(batch.texts)
+            if len(batch.texts) >= self.max_batch:
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                batch.closed = True
+                if self._open.get(model) is batch:
+                    del self._open[model]
+            try:
+                batch.result = self.send(model, batch.texts)["embeddings"]
+                with self._lock:
+                    self.batches_sent += 1
+                    self.inputs_batched += len(batch.texts)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.result[start:end]
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Run fn once per key at a time. Returns (result, shared) where shared means we joined another call."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    @property
+    def in_flight(self):
+        return len(self._calls)
+
+
+class OllamaClient:
+    """Ollama HTTP client with a persistent response cache and single-flight deduplication.
+
+    Identical requests (same endpoint, model, prompt and sampling options) that arrive
+    while one is already running wait for it instead of hitting the model server again;
+    completed responses are cached in memory and, when ``cache_dir`` is set, on disk.
+    Requests go over a pooled keep-alive session behind a concurrency limiter, and
+    concurrent embedding calls are micro-batched into single requests.
+    """
+
+    def __init__(self, base_url=OLLAMA_URL, timeout=OLLAMA_TIMEOUT, cache_dir=LM_CACHE_DIR,
+                 max_entries=LM_CACHE_MAX_ENTRIES, ttl=LM_CACHE_TTL, pool_size=OLLAMA_POOL_SIZE,
+                 limiter=None, embed_batch_size=OLLAMA_EMBED_BATCH_SIZE, embed_batch_window=OLLAMA_EMBED_BATCH_WINDOW):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = ResultCache(enabled=True, max_entries=max_entries, ttl=ttl, directory=cache_dir or None)
+        self.single_flight = SingleFlight()
+        self.limiter = limiter or ConcurrencyLimiter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.batcher = None
+        if embed_batch_size and embed_batch_size > 1:
+            self.batcher = EmbeddingBatcher(self._send_embed_batch, embed_batch_size, embed_batch_window)
+        self.requests_sent = 0
+        self.late_hits = 0  # Misses answered by the cache once this request became the single-flight leader
+        self._latencies = deque(maxlen=1000)
+        self._stats_lock = threading.Lock()
+
+    def _post(self, endpoint, payload):
+        with self.limiter:
+            started = time.perf_counter()
+            response = self.session.post(f"{self.base_url}{endpoint}", json=payload, timeout=self.timeout)
+            elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._latencies.append(elapsed)
+            self.requests_sent += 1
+        response.raise_for_status()
+        return response.json()
+
+    def _send_embed_batch(self, model, texts):
+        return self._post("/api/embed", {"model": model, "input": texts})
+
+    def request(self, endpoint, payload, cache=True):
+        """POST a non-streaming request, served from cache or a concurrent identical call when possible."""
+        payload = {**payload, "stream": False}
+        if not cache:
+            return self._dispatch(endpoint, payload)
+        key = lm_cache_key(endpoint, payload)
+        cached = self.cache.get(key, default=None)
+        if cached is not None:
+            return cached
+
+        def fetch():
+            # A previous leader may have finished between our cache miss and taking the lead.
+            value = self.cache.get(key, default=None, record=False)
+            if value is not None:
+                with self._stats_lock:
+                    self.late_hits += 1
+                return value
+            value = self._dispatch(endpoint, payload)
+            self.cache.set(key, value)
+            return value
+
+        result, _ = self.single_flight.do(key, fetch)
+        return result
+
+    def _dispatch(self, endpoint, payload):
+        # Plain embedding calls can share a request with others; anything with extra options goes alone.
+        if self.batcher is not None and endpoint == "/api/embed" and set(payload) <= {"model", "input", "stream"}:
+            inputs = payload["input"]
+            texts = [inputs] if isinstance(inputs, str) else list(inputs)
+            return {"model": payload["model"], "embeddings": self.batcher.embed(payload["model"], texts)}
+        return self._post(endpoint, payload)
+
+    def generate(self, model, prompt, options=None, cache=True, **fields):
+        """Call /api/generate and return the parsed response."""
+        return self.request("/api/generate", {"model": model, "prompt": prompt, "options": options or {}, **fields},
+                            cache=cache)
+
+    def chat(self, model, messages, options=None, cache=True, **fields):
+        """Call /api/chat and return the parsed response."""
+        return self.request("/api/chat", {"model": model, "messages": messages, "options": options or {}, **fields},
+                            cache=cache)
+
+    def embed(self, model, inputs, cache=True, **fields):
+        """Call /api/embed for one string or a list of strings."""
+        return self.request("/api/embed", {"model": model, "input": inputs, **fields}, cache=cache)
+
+    def stats(self):
+        cache_stats = self.cache.stats()
+        lookups = cache_stats["hits"] + cache_stats["misses"]
+        with self._stats_lock:
+            deduplicated = self.single_flight.shared + self.late_hits
+            requests_sent = self.requests_sent
+        return {
+            **cache_stats,
+            "deduplicated": deduplicated,
+            # Share of cached-mode requests that never reached the model server.
+            "effective_hit_ratio": (cache_stats["hits"] + deduplicated) / lookups if lookups else 0.0,
+            "in_flight": self.single_flight.in_flight,
+            "requests_sent": requests_sent,
+            "limiter": self.limiter.stats(),
+            "latency": self.latency_percentiles(),
+            "embed_batches_sent": self.batcher.batches_sent if self.batcher else 0,
+            "embed_inputs_batched": self.batcher.inputs_batched if self.batcher else 0,
+        }
+
+    def latency_percentiles(self):
+        """p50/p99 of the last 1000 upstream request latencies, in seconds."""
+        with self._stats_lock:
+            samples = sorted(list(self._latencies))
+        if not samples:
+            return {"p50": None, "p99": None, "samples": 0}
+
+        def pick(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+        return {"p50": pick(0.50), "p99": pick(0.99), "samples": len(samples)}
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_ollama_client():
+    """Return the process-wide Ollama client so every caller shares one cache."""
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = OllamaClient()
+    return _default_client
@@ -0,0 +1,86 @@
+# postgres_pool.py
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extras
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
+POSTGRES_PORT = int(os.getenv("POSTGRES_PORT", os.getenv("MW_POSTGRES_PORT", "5436")))
+POSTGRES_USER = os.getenv("POSTGRES_USER", "myuser")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "catsarecool")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "animals")
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", "1"))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+
+# Errors after which a connection cannot be trusted and must not go back into the pool.
+DISCONNECT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    POSTGRES_POOL_MIN, POSTGRES_POOL_MAX,
+                    host=POSTGRES_HOST, port=POSTGRES_PORT, user=POSTGRES_USER,
+                    password=POSTGRES_PASSWORD, dbname=POSTGRES_DB,
+                )
+                logger.info(f"Created Postgres pool for {POSTGRES_USER}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    """Borrow a pooled connection; commits on success and rolls back on error.
+
+    A connection that failed with a disconnect error is closed rather than returned to
+    the pool, so the next borrower does not get a dead socket.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except DISCONNECT_ERRORS:
+        broken = True
+        raise
+    except Exception:
+        try:
+            conn.rollback()
+        except DISCONNECT_ERRORS as e:
+            # Keep the original error; the rollback failure only means the connection is gone.
+            broken = True
+            logger.warning(f"Rollback failed; discarding the connection: {e}")
+        raise
+    finally:
+        pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+@contextmanager
+def get_cursor():
+    """Borrow a pooled connection and yield a cursor that returns rows as dicts."""
+    with get_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            yield cursor
+
+
+def close_pool():
+    """Close every pooled connection."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,272 @@
+# profiler.py
+
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_DEFAULT_MODE = os.getenv("PROFILING_DEFAULT_MODE", "sampling")  # "sampling" or "cprofile"
+PROFILING_RATE = float(os.getenv("PROFILING_RATE", "6"))  # Profiles allowed per minute
+PROFILING_BURST = int(os.getenv("PROFILING_BURST", "2"))
+PROFILING_MAX_CONCURRENT = int(os.getenv("PROFILING_MAX_CONCURRENT", "1"))
+PROFILING_SAMPLE_INTERVAL = float(os.getenv("PROFILING_SAMPLE_INTERVAL", "0.005"))  # Seconds between stack samples
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))  # Profiles kept in memory
+PROFILING_TRACEMALLOC_FRAMES = int(os.getenv("PROFILING_TRACEMALLOC_FRAMES", "1"))
+PROFILE_MODES = ("sampling", "cprofile")
+TOP_ENTRIES = 20
+
+
+def requested_mode(value):
+    """Map a header or query value to a profiling mode, or None when profiling was not asked for."""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    if value in PROFILE_MODES:
+        return value
+    return PROFILING_DEFAULT_MODE
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks.
+
+    Sampling reads ``sys._current_frames()`` from a separate thread, so the profiled
+    code runs unmodified and the cost is bounded by the sample interval.
+    """
+
+    def __init__(self, thread_id, interval=PROFILING_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self):
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """One profiled call: its collapsed stacks, optional pstats data and memory summary."""
+
+    def __init__(self, label, mode):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.mode = mode
+        self.created_at = time.time()
+        self.seconds = None
+        self.samples = 0
+        self.collapsed = ""
+        self.pstats_data = None
+        self.top_functions = []
+        self.memory = {}
+        self.error = None
+
+    def to_dict(self, detail=False):
+        data = {
+            "id": self.id,
+            "label": self.label,
+            "mode": self.mode,
+            "created_at": self.created_at,
+            "seconds": self.seconds,
+            "samples": self.samples,
+            "has_pstats": self.pstats_data is not None,
+            "peak_memory_bytes": self.memory.get("peak_bytes"),
+            "error": self.error,
+        }
+        if detail:
+            data["top_functions"] = self.top_functions
+            data["memory"] = self.memory
+        return data
+
+
+def _summarize_pstats(profiler):
+    stats = pstats.Stats(profiler)
+    top = []
+    for (filename, lineno, name), (_, calls, tottime, cumtime, _) in sorted(
+            stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_ENTRIES]:
+        top.append({"function": f"{name} ({filename}:{lineno})", "calls": calls,
+                    "tottime": tottime, "cumtime": cumtime})
+    return top
+
+
+def _summarize_memory(before, after, peak):
+    top = []
+    for stat in after.compare_to(before, "lineno")[:TOP_ENTRIES]:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        top.append({"location": f"{frame.filename}:{frame.lineno}", "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff})
+    return {"peak_bytes": peak, "top_allocations": top}
+
+
+class Profiler:
+    """Runs opted-in calls under a profiler and keeps the most recent profiles.
+
+    A token bucket (``rate`` per minute, up to ``burst``) and a concurrency cap decide
+    whether a request gets profiled; requests over the limit run unprofiled, so asking
+    for profiles never slows or rejects traffic. The cap defaults to one because
+    tracemalloc is process-wide and would mix concurrent calls' allocations.
+    """
+
+    def __init__(self, enabled=PROFILING_ENABLED, rate=PROFILING_RATE, burst=PROFILING_BURST,
+                 max_concurrent=PROFILING_MAX_CONCURRENT, max_profiles=PROFILING_MAX_PROFILES,
+                 interval=PROFILING_SAMPLE_INTERVAL):
+        self.enabled = enabled
+        self.rate = rate / 60.0
+        self.burst = max(1, burst)
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_profiles = max_profiles
+        self.interval = interval
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._active = 0
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()
+        self.profiled = 0
+        self.skipped = 0
+
+    def _acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._active >= self.max_concurrent or self._tokens < 1:
+                self.skipped += 1
+                return False
+            self._tokens -= 1
+            self._active += 1
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    @contextmanager
+    def profile(self, label, mode=None):
+        """Profile the enclosed block, yielding the Profile, or None when disabled or rate limited."""
+        mode = mode if mode in PROFILE_MODES else PROFILING_DEFAULT_MODE
+        if not self.enabled or not self._acquire():
+            yield None
+            return
+        profile = Profile(label, mode)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(PROFILING_TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.take_snapshot()
+        sampler = StackSampler(threading.get_ident(), self.interval).start()
+        profiler = cProfile.Profile() if mode == "cprofile" else None
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield profile
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                profile.seconds = time.perf_counter() - started
+                sampler.stop()
+        except BaseException as e:
+            profile.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            try:
+                _, peak = tracemalloc.get_traced_memory()
+                profile.memory = _summarize_memory(memory_before, tracemalloc.take_snapshot(), peak)
+                if started_tracing:
+                    tracemalloc.stop()
+                profile.samples = sampler.samples
+                profile.collapsed = sampler.collapsed()
+                if profiler is not None:
+                    profiler.create_stats()
+                    profile.pstats_data = marshal.dumps(profiler.stats)  # Same layout as Stats.dump_stats
+                    profile.top_functions = _summarize_pstats(profiler)
+                self._store(profile)
+            finally:
+                self._release()
+
+    def _store(self, profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+            self.profiled += 1
+        logger.info(f"Profiled {profile.label} ({profile.mode}) in {profile.seconds:.3f}s as {profile.id}.")
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [profile.to_dict() for profile in reversed(profiles)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "rate_per_minute": self.rate * 60,
+                "burst": self.burst,
+                "tokens": self._tokens,
+                "active": self._active,
+                "max_concurrent": self.max_concurrent,
+                "profiled": self.profiled,
+                "skipped": self.skipped,
+                "stored": len(self._profiles),
+            }
+
+
+_default_profiler = None
+_default_lock = threading.Lock()
+
+
+def get_profiler():
+    """Return the process-wide profiler, creating it on first use."""
+    global _default_profiler
+    if _default_profiler is None:
+        with _default_lock:
+            if _default_profiler is None:
+                _default_profiler = Profiler()
+    return _default_profiler
@@ -0,0 +1,117 @@
+# qa_dataset.py
+
+import argparse
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QA_DATA_DIR = os.getenv("QA_DATA_DIR", "data")
+QA_DATASET_PATH = os.getenv("QA_DATASET_PATH", "qa_dataset")
+SOURCES_FILE = "qa_sources.json"
+
+
+class QADatasetStore:
+    """Arrow-backed, memory-mapped store of the QA JSON-lines files in ``data/``.
+
+    ``build`` converts the files once with pyarrow's JSON reader, so answer texts never
+    become Python objects; ``load`` memory-maps the result. Rows can be read by index,
+    streamed in batches, split into train/dev views that share the same Arrow data,
+    and turned into DSPy examples lazily.
+    """
+
+    def __init__(self, data_dir=QA_DATA_DIR, store_path=QA_DATASET_PATH):
+        self.data_dir = Path(data_dir)
+        self.store_path = Path(store_path)
+        self._dataset = None
+
+    def _sources(self):
+        sources = {}
+        for path in sorted(self.data_dir.glob("*.txt")):
+            st = path.stat()
+            sources[str(path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        return sources
+
+    def is_stale(self):
+        sources_file = self.store_path / SOURCES_FILE
+        if not sources_file.exists():
+            return True
+        return json.loads(sources_file.read_text()) != self._sources()
+
+    def build(self, force=False):
+        """Convert the QA files into the Arrow store if any of them changed. Returns True if rebuilt."""
+        if not force and not self.is_stale():
+            return False
+        from datasets import Dataset
+
+        sources = self._sources()
+        if not sources:
+            raise FileNotFoundError(f"No QA files (*.txt) found in {self.data_dir}.")
+        dataset = Dataset.from_json(list(sources), keep_in_memory=False)
+
+        # Write next to the store and swap, so readers never see a half-written store.
+        tmp_path = self.store_path.with_name(self.store_path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        dataset.save_to_disk(str(tmp_path))
+        (tmp_path / SOURCES_FILE).write_text(json.dumps(sources, indent=2))
+        shutil.rmtree(self.store_path, ignore_errors=True)
+        os.replace(tmp_path, self.store_path)
+        self._dataset = None
+        logger.info(f"Built QA dataset store with {len(dataset)} rows at {self.store_path}")
+        return True
+
+    def load(self):
+        """Return the memory-mapped Dataset, building the store first if needed."""
+        if self._dataset is None:
+            from datasets import load_from_disk
+            self.build()
+            self._dataset = load_from_disk(str(self.store_path))
+        return self._dataset
+
+    def __len__(self):
+        return len(self.load())
+
+    def __getitem__(self, index):
+        return self.load()[index]
+
+    def iter_rows(self, batch_size=1000, columns=None):
+        """Stream rows in Arrow batches without materializing the whole table."""
+        dataset = self.load()
+        if columns:
+            dataset = dataset.select_columns(columns)
+        for batch in dataset.iter(batch_size=batch_size):
+            keys = list(batch)
+            for values in zip(*(batch[key] for key in keys)):
+                yield dict(zip(keys, values))
+
+    def split(self, dev_fraction=0.2, seed=0):
+        """Return (train, dev) views over a seeded shuffle. Only the index mapping is held in memory."""
+        dataset = self.load()
+        order = np.random.default_rng(seed).permutation(len(dataset))
+        cut = len(dataset) - int(round(len(dataset) * dev_fraction))
+        train = dataset.select(np.sort(order[:cut]), keep_in_memory=True)
+        dev = dataset.select(np.sort(order[cut:]), keep_in_memory=True)
+        return train, dev
+
+    @staticmethod
+    def to_examples(view, input_keys=("question",)):
+        """Lazily yield dspy.Example objects for a dataset or split view."""
+        import dspy
+        for row in view:
+            yield dspy.Example(**row).with_inputs(*input_keys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert data/*.txt QA files into the memory-mapped Arrow store.")
+    parser.add_argument("--data-dir", default=QA_DATA_DIR)
+    parser.add_argument("--output", default=QA_DATASET_PATH)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    store = QADatasetStore(args.data_dir, args.output)
+    rebuilt = store.build(force=args.force)
+    print(f"QA dataset store at {args.output} {'rebuilt' if rebuilt else 'already up to date'}: {len(store)} rows.")
@@ -0,0 +1,328 @@
+# qa_search.py
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QA_DATA_DIR = os.getenv("QA_DATA_DIR", "data")
+QA_INDEX_PATH = os.getenv("QA_INDEX_PATH", "qa_index")
+QA_WITH_VECTORS = os.getenv("QA_WITH_VECTORS", "true").lower() in ("1", "true", "yes")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+QA_INDEX_REFRESH_SECONDS = float(os.getenv("QA_INDEX_REFRESH_SECONDS", "30"))  # Min gap between data/ rescans
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MANIFEST_FILE = "manifest.json"
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def qa_text(item):
+    return f"{item.get('question', '')}\n{item.get('answer', '')}"
+
+
+def iter_qa_lines(path):
+    """Yield (byte offset, parsed item) for every JSON line in a QA file."""
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                try:
+                    yield offset, json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed line at byte {offset} of {path}")
+            offset += len(line)
+
+
+class Segment:
+    """BM25 postings (and optional embeddings) for one QA file, stored as CSR arrays.
+
+    Postings for term ``t`` are ``docs[term_ptr[t]:term_ptr[t + 1]]`` with matching
+    ``tfs``. Documents are not copied: ``offsets`` point back into the source file.
+    """
+
+    ARRAYS = ("term_ptr", "docs", "tfs", "doc_lens", "offsets")
+
+    def __init__(self, path, source, terms, arrays, vectors=None):
+        self.path = Path(path)
+        self.source = source
+        self.terms = terms
+        self.term_ptr, self.docs, self.tfs, self.doc_lens, self.offsets = (arrays[name] for name in self.ARRAYS)
+        self.vectors = vectors
+        self.norms = None
+
+    @property
+    def size(self):
+        return len(self.doc_lens)
+
+    @classmethod
+    def build(cls, source, path, with_vectors=QA_WITH_VECTORS):
+        postings, doc_lens, offsets, texts = {}, [], [], []
+        for doc_id, (offset, item) in enumerate(iter_qa_lines(source)):
+            text = qa_text(item)
+            tokens = tokenize(text)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc_id)
+                postings[term][1].append(min(tf, 65535))
+            doc_lens.append(len(tokens))
+            offsets.append(offset)
+            if with_vectors:
+                texts.append(text)
+
+        terms = sorted(postings)
+        term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            term_ptr[i + 1] = term_ptr[i] + len(postings[term][0])
+        arrays = {
+            "term_ptr": term_ptr,
+            "docs": np.fromiter((d for t in terms for d in postings[t][0]), dtype=np.uint32, count=int(term_ptr[-1])),
+            "tfs": np.fromiter((f for t in terms for f in postings[t][1]), dtype=np.uint16, count=int(term_ptr[-1])),
+            "doc_lens": np.asarray(doc_lens, dtype=np.uint32),
+            "offsets": np.asarray(offsets, dtype=np.int64),
+        }
+        vectors = None
+        if with_vectors and texts:
+            try:
+                from modules.context_ingestion import embed_texts
+                vectors = np.asarray(embed_texts(texts), dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            except Exception as e:  # Missing package or a failing embedding backend
+                logger.warning(f"Embeddings unavailable, indexing {source} for BM25 only: {e}")
+                vectors = None
+        segment = cls(path, str(source), {term: i for i, term in enumerate(terms)}, arrays, vectors)
+        segment.save()
+        return segment
+
+    def save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(self.path / f"{name}.npy", getattr(self, name))
+        if self.vectors is not None:
+            np.save(self.path / "vectors.npy", self.vectors)
+        with open(self.path / "terms.json", "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "terms": sorted(self.terms, key=self.terms.get)}, f)
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in cls.ARRAYS}
+        vectors_file = path / "vectors.npy"
+        vectors = np.load(vectors_file, mmap_mode="r") if vectors_file.exists() else None
+        with open(path / "terms.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(path, meta["source"], {term: i for i, term in enumerate(meta["terms"])}, arrays, vectors)
+
+    def doc_freq(self, term):
+        i = self.terms.get(term)
+        return 0 if i is None else int(self.term_ptr[i + 1] - self.term_ptr[i])
+
+    def bm25(self, query_terms, idf, k1=BM25_K1):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in query_terms:
+            i = self.terms.get(term)
+            if i is None:
+                continue
+            start, end = self.term_ptr[i], self.term_ptr[i + 1]
+            docs = self.docs[start:end]
+            tfs = self.tfs[start:end].astype(np.float32)
+            # Each doc appears once per term's postings, so fancy-index += is safe.
+            scores[docs] += idf[term] * tfs * (k1 + 1) / (tfs + self.norms[docs])
+        return scores
+
+    def read(self, doc_id):
+        with open(self.source, "rb") as f:
+            f.seek(int(self.offsets[doc_id]))
+            return json.loads(f.readline())
+
+
+def _top(scores, k):
+    if k >= len(scores):
+        order = np.argsort(-scores)
+    else:
+        part = np.argpartition(-scores, k)[:k]
+        order = part[np.argsort(-scores[part])]
+    return order
+
+
+class QAIndex:
+    """Hybrid BM25 + vector search over the QA JSON-lines files in ``data/``.
+
+    Each QA file is indexed once into its own segment; ``update`` indexes only new or
+    changed files and drops segments for removed ones. Global BM25 statistics and
+    per-document length norms are recomputed across segments after every update.
+    """
+
+    def __init__(self, data_dir=QA_DATA_DIR, index_path=QA_INDEX_PATH, with_vectors=QA_WITH_VECTORS):
+        self.data_dir = Path(data_dir)
+        self.index_path = Path(index_path)
+        self.with_vectors = with_vectors
+        self.segments = {}
+        self._lock = threading.RLock()
+        self._manifest = {}
+        self._load()
+
+    def _load(self):
+        manifest_file = self.index_path / MANIFEST_FILE
+        if manifest_file.exists():
+            self._manifest = json.loads(manifest_file.read_text())
+            for source, entry in self._manifest.items():
+                try:
+                    self.segments[source] = Segment.load(self.index_path / entry["segment"])
+                except (OSError, KeyError, ValueError) as e:
+                    logger.warning(f"Discarding unreadable QA segment for {source}: {e}")
+        self._prepare()
+
+    def _prepare(self):
+        segments = list(self.segments.values())
+        self.total_docs = sum(s.size for s in segments)
+        total_len = sum(int(np.sum(s.doc_lens, dtype=np.int64)) for s in segments)
+        self.avgdl = total_len / self.total_docs if self.total_docs else 0.0
+        for segment in segments:
+            segment.norms = (BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(segment.doc_lens, dtype=np.float32)
+                                        / max(self.avgdl, 1e-9))).astype(np.float32)
+
+    def update(self):
+        """Index new or changed QA files and drop removed ones. Returns the sources reindexed."""
+        with self._lock:
+            current = {}
+            for path in sorted(self.data_dir.glob("*.txt")):
+                st = path.stat()
+                current[str(path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+            changed = []
+            for source, stat in current.items():
+                entry = self._manifest.get(source)
+                segment = self.segments.get(source)
+                # A segment built without vectors is rebuilt once vectors are asked for, and vice versa.
+                # The flag records what was asked for, so a failing embedding backend is not retried
+                # on every update; it is retried when the file changes.
+                built_with_vectors = entry.get("vectors", segment is not None and segment.vectors is not None) \
+                    if entry else None
+                if entry and entry["size"] == stat["size"] and entry["mtime_ns"] == stat["mtime_ns"] \
+                        and segment is not None and built_with_vectors == self.with_vectors:
+                    continue
+                name = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+                segment_path = self.index_path / "segments" / name
+                shutil.rmtree(segment_path, ignore_errors=True)
+                self.segments[source] = Segment.build(source, segment_path, self.with_vectors)
+                self._manifest[source] = {**stat, "segment": f"segments/{name}", "vectors": self.with_vectors}
+                changed.append(source)
+
+            for source in set(self._manifest) - set(current):
+                shutil.rmtree(self.index_path / self._manifest.pop(source)["segment"], ignore_errors=True)
+                self.segments.pop(source, None)
+                changed.append(source)
+
+            if changed:
+                self.index_path.mkdir(parents=True, exist_ok=True)
+                (self.index_path / MANIFEST_FILE).write_text(json.dumps(self._manifest, indent=2))
+                self._prepare()
+                logger.info(f"QA index updated for {len(changed)} files; {self.total_docs} documents total")
+            return changed
+
+    def _bm25_ranking(self, query, limit):
+        terms = tokenize(query)
+        idf = {}
+        for term in set(terms):
+            df = sum(s.doc_freq(term) for s in self.segments.values())
+            if df:
+                idf[term] = math.log(1 + (self.total_docs - df + 0.5) / (df + 0.5))
+        hits = []
+        for source, segment in self.segments.items():
+            scores = segment.bm25([t for t in terms if t in idf], idf)
+            for doc_id in _top(scores, limit):
+                if scores[doc_id] > 0:
+                    hits.append((float(scores[doc_id]), source, int(doc_id)))
+        return sorted(hits, reverse=True)[:limit]
+
+    def _vector_ranking(self, query, limit):
+        segments = [(source, s) for source, s in self.segments.items() if s.vectors is not None]
+        if not segments:
+            return []
+        try:
+            from modules.context_ingestion import embed_texts
+            q = np.asarray(embed_texts([query])[0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, ranking by BM25 only: {e}")
+            return []
+        q /= max(np.linalg.norm(q), 1e-12)
+        hits = []
+        for source, segment in segments:
+            scores = segment.vectors @ q
+            for doc_id in _top(scores, limit):
+                hits.append((float(scores[doc_id]), source, int(doc_id)))
+        return sorted(hits, reverse=True)[:limit]
+
+    def search(self, query, k=10, mode="hybrid", candidates=100, rrf_k=RRF_K):
+        """Search the QA corpus. ``mode`` is 'bm25', 'vector' or 'hybrid' (reciprocal-rank fusion)."""
+        with self._lock:
+            if not self.total_docs:
+                return []
+            rankings = {}
+            if mode in ("bm25", "hybrid"):
+                rankings["bm25"] = self._bm25_ranking(query, max(k, candidates))
+            if mode in ("vector", "hybrid"):
+                rankings["vector"] = self._vector_ranking(query, max(k, candidates))
+
+            fused = {}
+            for name, ranking in rankings.items():
+                for rank, (score, source, doc_id) in enumerate(ranking, start=1):
+                    hit = fused.setdefault((source, doc_id), {"score": 0.0})
+                    hit["score"] += 1.0 / (rrf_k + rank)
+                    hit[f"{name}_rank"] = rank
+                    hit[f"{name}_score"] = score
+
+            results = []
+            for (source, doc_id), hit in sorted(fused.items(), key=lambda kv: -kv[1]["score"])[:k]:
+                item = self.segments[source].read(doc_id)
+                results.append({**hit, "source": source, "question": item.get("question"), "answer": item.get("answer")})
+            return results
+
+
+_default_index = None
+_default_lock = threading.Lock()
+_last_refresh = 0.0
+
+
+def get_qa_index():
+    """Return the shared QA index, picking up changes in data/ at most every QA_INDEX_REFRESH_SECONDS."""
+    global _default_index, _last_refresh
+    with _default_lock:
+        if _default_index is None:
+            _default_index = QAIndex()
+        now = time.monotonic()
+        if not _last_refresh or now - _last_refresh >= QA_INDEX_REFRESH_SECONDS:
+            _default_index.update()
+            _last_refresh = now
+    return _default_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the hybrid QA search index.")
+    parser.add_argument("query", nargs="?", help="Optional query to run after updating the index")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--mode", default="hybrid", choices=["bm25", "vector", "hybrid"])
+    parser.add_argument("--no-vectors", action="store_true")
+    args = parser.parse_args()
+    qa_index = QAIndex(with_vectors=not args.no_vectors)
+    print(f"Reindexed: {qa_index.update() or 'nothing changed'}")
+    if args.query:
+        for hit in qa_index.search(args.query, k=args.k, mode=args.mode):
+            print(f"{hit['score']:.4f}  {hit['question'][:80]!r}")
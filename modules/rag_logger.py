@@ -2,8 +2,160 @@
 
 import os
 import json
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Cross-process append lock on POSIX
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+RAG_LOG_PATH = os.getenv("RAG_LOG_PATH", "rag_log.jsonl")  # Append-only JSON-lines log
+LEGACY_RAG_LOG_PATH = "rag_log.json"  # Old single JSON array, migrated on first use
+RAG_LOG_MAX_BYTES = int(os.getenv("RAG_LOG_MAX_BYTES", str(50 * 1024 * 1024)))  # Rotate beyond this size
+RAG_LOG_BACKUPS = int(os.getenv("RAG_LOG_BACKUPS", "5"))  # Rotated files kept as .1 ... .N
+
+
+class RagLog:
+    """Append-only JSON-lines RAG log with size-based rotation and an offset index.
+
+    Each entry is one line, so logging is a single append under a lock. The index
+    maps ``id`` and ``user_id`` to byte offsets and is extended incrementally,
+    so paging and filtering only read the lines they return.
+    """
+
+    def __init__(self, path=RAG_LOG_PATH, max_bytes=RAG_LOG_MAX_BYTES, backups=RAG_LOG_BACKUPS,
+                 legacy_path=LEGACY_RAG_LOG_PATH):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._reset_index()
+
+    def _reset_index(self):
+        self._entries = []  # (file path, byte offset) for every entry, oldest first
+        self._by_id = {}
+        self._by_user = {}
+        self._indexed = {}  # file path -> (inode, bytes already indexed)
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """Cross-process lock on a sidecar file, which unlike the log itself is never renamed."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _files(self):
+        """Log files from oldest to newest."""
+        rotated = [f"{self.path}.{n}" for n in range(self.backups, 0, -1)]
+        return [p for p in rotated if os.path.exists(p)] + [self.path]
+
+    def _migrate_legacy(self):
+        if not self.legacy_path or not os.path.exists(self.legacy_path) or os.path.exists(self.path):
+            return
+        with open(self.legacy_path, 'r') as legacy_file:
+            items = json.load(legacy_file)
+        with open(self.path, 'w') as log_file:
+            for item in items:
+                log_file.write(json.dumps(item) + "\n")
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        print(f"Migrated {len(items)} RAG items from {self.legacy_path} to {self.path}.")
+
+    def _index_entry(self, entry, path, offset):
+        position = len(self._entries)
+        self._entries.append((path, offset))
+        self._by_id.setdefault(entry.get("id"), []).append(position)
+        self._by_user.setdefault(entry.get("user_id"), []).append(position)
+
+    def _refresh_index(self):
+        """Index any bytes appended since the last refresh, including by other processes."""
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            inode, start = self._indexed.get(path, (stat.st_ino, 0))
+            if inode != stat.st_ino or stat.st_size < start:
+                # The file was rotated underneath us; rebuild from scratch.
+                self._reset_index()
+                return self._refresh_index()
+            with open(path, 'rb') as log_file:
+                log_file.seek(start)
+                offset = start
+                for line in log_file:
+                    if not line.endswith(b"\n"):
+                        break  # Partially written line; pick it up next time
+                    try:
+                        self._index_entry(json.loads(line), path, offset)
+                    except json.JSONDecodeError:
+                        pass
+                    offset += len(line)
+            self._indexed[path] = (stat.st_ino, offset)
+
+    def _rotate(self):
+        for n in range(self.backups, 0, -1):
+            src = f"{self.path}.{n - 1}" if n > 1 else self.path
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{n}")
+        if self.backups == 0 and os.path.exists(self.path):
+            os.remove(self.path)
+        self._reset_index()
+
+    def append(self, entry):
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with self._lock, self._file_lock():
+            self._migrate_legacy()
+            # Size is checked and rotation done under the lock, so only one process rotates
+            # and nobody appends to a file that has just been renamed away.
+            log_file = open(self.path, 'ab')
+            try:
+                size = os.fstat(log_file.fileno()).st_size
+                if size and size + len(line) > self.max_bytes:
+                    log_file.close()
+                    self._rotate()
+                    log_file = open(self.path, 'ab')
+                log_file.write(line)
+                log_file.flush()
+            finally:
+                log_file.close()
+
+    def _read(self, position):
+        path, offset = self._entries[position]
+        with open(path, 'rb') as log_file:
+            log_file.seek(offset)
+            return json.loads(log_file.readline())
+
+    def query(self, item_id=None, user_id=None, page=1, page_size=50):
+        """Return (items, total) for one page of entries, optionally filtered by id and/or user_id."""
+        with self._lock:
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                with self._file_lock():
+                    self._migrate_legacy()
+            with self._file_lock(shared=True):
+                self._refresh_index()
+                if item_id is not None and user_id is not None:
+                    users = set(self._by_user.get(user_id, []))
+                    positions = [p for p in self._by_id.get(item_id, []) if p in users]
+                elif item_id is not None:
+                    positions = self._by_id.get(item_id, [])
+                elif user_id is not None:
+                    positions = self._by_user.get(user_id, [])
+                else:
+                    positions = range(len(self._entries))
+                start = max(page - 1, 0) * page_size
+                selected = positions[start:start + page_size]
+                return [self._read(position) for position in selected], len(positions)
+
+
+rag_log = RagLog()
 
-RAG_LOG_PATH = "rag_log.json"  # Path to the RAG log file
 
 def log_rag_item(file_info):
     try:
@@ -19,33 +171,23 @@ def log_rag_item(file_info):
             "meta": file_info.get("meta"),
             "created_at": file_info.get("created_at")
         }
-        if not os.path.exists(RAG_LOG_PATH):
-            with open(RAG_LOG_PATH, 'w') as log_file:
-                json.dump([], log_file)
-
-        with open(RAG_LOG_PATH, 'r') as log_file:
-            rag_log = json.load(log_file)
-
         rag_log.append(log_entry)
-
-        with open(RAG_LOG_PATH, 'w') as log_file:
-            json.dump(rag_log, log_file, indent=4)
-            print("RAG item successfully logged.")
+        print("RAG item successfully logged.")
     except Exception as e:
         print(f"Failed to log RAG item: {e}")
 
-def view_rag_log():
+def view_rag_log(page=1, page_size=50, item_id=None, user_id=None):
     try:
-        if not os.path.exists(RAG_LOG_PATH):
-            print("No RAG items logged yet.")
-            return
+        items, total = rag_log.query(item_id=item_id, user_id=user_id, page=page, page_size=page_size)
+        if not items:
+            print("No RAG items logged yet." if not total else f"No RAG items on page {page}.")
+            return items
 
-        with open(RAG_LOG_PATH, 'r') as log_file:
-            rag_log = json.load(log_file)
-            if not rag_log:
-                print("No RAG items logged yet.")
-            else:
-                for idx, item in enumerate(rag_log, start=1):
-                    print(f"{idx}. File Name: {item['meta']['name']}, File ID: {item['id']}, Created At: {item['created_at']}")
+        start = (max(page, 1) - 1) * page_size
+        for idx, item in enumerate(items, start=start + 1):
+            name = (item.get('meta') or {}).get('name', item.get('filename'))
+            print(f"{idx}. File Name: {name}, File ID: {item['id']}, Created At: {item['created_at']}")
+        print(f"Showing {len(items)} of {total} RAG items (page {page}).")
+        return items
     except Exception as e:
         print(f"Failed to read RAG log: {e}")
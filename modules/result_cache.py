@@ -0,0 +1,165 @@
+# result_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Default for functions without a YAML ``cache`` setting; off, since calls may sample or have side effects.
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))  # Seconds; 0 disables expiry
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR")  # Enables the on-disk tier when set
+RESULT_CACHE_DISK_SIZE = int(os.getenv("RESULT_CACHE_DISK_SIZE", str(1024 ** 3)))  # Bytes
+
+_MISSING = object()
+
+
+def make_cache_key(module_name, function_name, args, kwargs):
+    """Build a stable hash key for a function call; kwargs order does not matter."""
+    payload = json.dumps([module_name, function_name, list(args), kwargs], sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier memoization cache: in-memory LRU with TTL, plus an optional diskcache tier.
+
+    Caching is opt-in and decided per function: explicit policies set with ``set_policy``
+    win, then a ``cache`` setting on the module's YAML entry (a bool, or a mapping of
+    function name to bool), then the global default. Keys include the module's version,
+    so disk entries written by older code are not served after the module changes.
+    """
+
+    def __init__(self, enabled=RESULT_CACHE_ENABLED, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 ttl=RESULT_CACHE_TTL, directory=RESULT_CACHE_DIR, disk_size=RESULT_CACHE_DISK_SIZE):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._policies = {}
+        self._generations = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk = None
+        if directory:
+            try:
+                import diskcache
+                self.disk = diskcache.Cache(directory, size_limit=disk_size)
+            except ImportError:
+                logger.warning("diskcache is not installed; result cache will be memory-only.")
+
+    def set_policy(self, module_name, function_name, enabled):
+        """Force caching on or off for one function; pass None to clear the override."""
+        if enabled is None:
+            self._policies.pop((module_name, function_name), None)
+        else:
+            self._policies[(module_name, function_name)] = bool(enabled)
+
+    def invalidate_module(self, module_name):
+        """Stop serving results cached for ``module_name``; old entries age out of the LRU/TTL."""
+        with self._lock:
+            self._generations[module_name] = self._generations.get(module_name, 0) + 1
+
+    def is_cacheable(self, module_name, function_name, module_info=None):
+        policy = self._policies.get((module_name, function_name))
+        if policy is not None:
+            return policy
+        setting = (module_info or {}).get("cache")
+        if isinstance(setting, dict):
+            setting = setting.get(function_name, setting.get("default"))
+        if isinstance(setting, bool):
+            return setting
+        return self.enabled
+
+    def get(self, key, default=_MISSING, record=True):
+        """Return the cached value for ``key``, or ``default`` (the _MISSING sentinel unless given).
+
+        Pass ``record=False`` for a re-check that should not count towards hits and misses.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if not expires_at or expires_at > now:
+                    self._memory.move_to_end(key)
+                    if record:
+                        self.hits += 1
+                    return value
+                del self._memory[key]
+        if self.disk is not None:
+            value = self.disk.get(key, default=_MISSING)
+            if value is not _MISSING:
+                self._store_memory(key, value)
+                if record:
+                    with self._lock:
+                        self.hits += 1
+                        self.disk_hits += 1
+                return value
+        if record:
+            with self._lock:
+                self.misses += 1
+        return default
+
+    def _store_memory(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def set(self, key, value):
+        self._store_memory(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expire=self.ttl or None)
+            except Exception as e:
+                logger.warning(f"Could not write result to disk cache: {e}")
+
+    def get_or_call(self, module_name, function_name, args, kwargs, func, module_info=None, bypass=False,
+                    module_version=None):
+        """Return a cached result or call ``func(*args, **kwargs)`` and cache a non-None result.
+
+        ``module_version`` (see ``ModuleRegistry.module_version``) is part of the key.
+        With ``bypass=True`` the cache is neither read nor written.
+        """
+        if bypass or not self.is_cacheable(module_name, function_name, module_info):
+            return func(*args, **kwargs)
+        generation = self._generations.get(module_name)
+        key = make_cache_key([module_name, module_version, generation], function_name, args, kwargs)
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+        value = func(*args, **kwargs)
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "disk_entries": len(self.disk) if self.disk is not None else None,
+            }
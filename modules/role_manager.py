@@ -1,34 +1,75 @@
 import subprocess
 import os
-from neo4j import GraphDatabase  # Neo4j Python Driver
+from modules.metrics import db_call
+from modules.neo4j_manager import get_driver
 from modules.role_db_operations import role_exists, list_roles, update_role, add_or_update_role
 from modules.role_file_operations import read_role_data_from_yaml
 from modules.role_input_operations import get_role_details_from_user, validate_role_details
 
+ROLE_IMPORT_BATCH_SIZE = int(os.getenv("ROLE_IMPORT_BATCH_SIZE", "1000"))
+ROLE_FIELDS = ("type", "description", "skills", "expertise_level")
+
 class Neo4jRoleManager:
 
     def __init__(self, uri, user, password):
-        """Initialize Neo4j connection."""
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        """Initialize Neo4j connection using the shared driver for these settings."""
+        self.driver = get_driver(uri, user, password)
 
     def close(self):
-        """Close the connection."""
-        self.driver.close()
+        """Release the manager. The shared driver stays open for other users."""
+        self.driver = None
 
     def add_role(self, role_name, role_type, description, skills, expertise_level):
-        """Add a role to the Neo4j database."""
+        """Add or update a role in the Neo4j database."""
         with self.driver.session() as session:
             session.write_transaction(self._create_and_return_role, role_name, role_type, description, skills, expertise_level)
 
     @staticmethod
     def _create_and_return_role(tx, role_name, role_type, description, skills, expertise_level):
         query = (
-            "CREATE (r:Role {name: $role_name, type: $role_type, description: $description, "
-            "skills: $skills, expertise_level: $expertise_level}) "
+            "MERGE (r:Role {name: $role_name}) "
+            "SET r.type = $role_type, r.description = $description, "
+            "r.skills = $skills, r.expertise_level = $expertise_level "
             "RETURN r"
         )
         tx.run(query, role_name=role_name, role_type=role_type, description=description, skills=skills, expertise_level=expertise_level)
 
+    def import_roles(self, roles, batch_size=ROLE_IMPORT_BATCH_SIZE):
+        """Upsert many roles, one UNWIND ... MERGE transaction per batch. Returns the count imported."""
+        rows = []
+        for role in roles:
+            name = role.get("name") or role.get("role_name")
+            if not name:
+                print(f"Skipping role without a name: {role}")
+                continue
+            row = {"name": name}
+            for field in ROLE_FIELDS:
+                row[field] = role.get(field, role.get(f"role_{field}"))
+            rows.append(row)
+
+        with db_call("neo4j", "import_roles"), self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                session.write_transaction(self._upsert_roles, rows[start:start + batch_size])
+        print(f"Imported {len(rows)} roles into Neo4j.")
+        return len(rows)
+
+    @staticmethod
+    def _upsert_roles(tx, rows):
+        query = (
+            "UNWIND $rows AS row "
+            "MERGE (r:Role {name: row.name}) "
+            "SET r.type = row.type, r.description = row.description, "
+            "r.skills = row.skills, r.expertise_level = row.expertise_level"
+        )
+        tx.run(query, rows=rows).consume()
+
+    def import_roles_from_yaml(self, file_path):
+        """Bulk import roles read with read_role_data_from_yaml."""
+        data = read_role_data_from_yaml(file_path)
+        if isinstance(data, dict):
+            data = data.get("roles", [data])
+        return self.import_roles(data or [])
+
     def update_role(self, role_name, updates):
         """Update a role's properties in Neo4j."""
         with self.driver.session() as session:
@@ -82,7 +123,8 @@ def role_management_menu():
             print("4. Update Role in Neo4j")
             print("5. Delete Role in Neo4j")
             print("6. List All Roles in Neo4j")
-            print("7. Back to Main Menu")
+            print("7. Import Roles from YAML")
+            print("8. Back to Main Menu")
 
             choice = input("Enter your choice: ")
 
@@ -128,6 +170,10 @@ def role_management_menu():
                 neo4j_manager.list_roles()
 
             elif choice == '7':
+                file_path = input("Enter the path of the roles YAML file: ").strip()
+                neo4j_manager.import_roles_from_yaml(file_path)
+
+            elif choice == '8':
                 break
             else:
                 print("Invalid choice. Please try again.")
@@ -0,0 +1,179 @@
+# vector_index.py
+
+import argparse
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "vector_index")
+VECTOR_INDEX_KIND = os.getenv("VECTOR_INDEX_KIND", "hnsw")  # flat, ivf or hnsw
+VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", "0"))  # IVF lists; 0 picks ~4*sqrt(n)
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))  # IVF lists scanned per query
+VECTOR_INDEX_HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+VECTOR_INDEX_EF_SEARCH = int(os.getenv("VECTOR_INDEX_EF_SEARCH", "64"))  # HNSW candidates per query
+VECTOR_INDEX_MMAP = os.getenv("VECTOR_INDEX_MMAP", "true").lower() in ("1", "true", "yes")
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.jsonl"
+
+
+def _faiss():
+    # faiss is heavy; only pay for the import when an index is actually used.
+    import faiss
+    return faiss
+
+
+def _normalize(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    """In-process cosine-similarity index over context chunks, backed by FAISS.
+
+    ``kind`` selects an exact flat index, an IVF index (recall tuned with ``nprobe``)
+    or an HNSW graph (recall tuned with ``ef_search``). Saved indexes are loaded
+    memory-mapped where FAISS supports it, so startup does not copy them into RAM.
+    """
+
+    def __init__(self, index, chunks, kind):
+        self.index = index
+        self.chunks = chunks
+        self.kind = kind
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, embeddings, chunks, kind=VECTOR_INDEX_KIND, nlist=VECTOR_INDEX_NLIST, hnsw_m=VECTOR_INDEX_HNSW_M):
+        """Build an index from an (n, d) embedding matrix and the matching chunk dicts."""
+        faiss = _faiss()
+        vectors = _normalize(embeddings)
+        n, dim = vectors.shape
+        if kind == "ivf":
+            nlist = nlist or max(1, min(int(4 * np.sqrt(n)), n // 39 or 1))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+        elif kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif kind == "flat":
+            index = faiss.IndexFlatIP(dim)
+        else:
+            raise ValueError(f"Unknown vector index kind '{kind}'. Use flat, ivf or hnsw.")
+        index.add(vectors)
+        logger.info(f"Built {kind} vector index with {n} vectors of dimension {dim}")
+        return cls(index, list(chunks), kind)
+
+    def save(self, path=VECTOR_INDEX_PATH):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        _faiss().write_index(self.index, str(path / INDEX_FILE))
+        with open(path / CHUNKS_FILE, "w", encoding="utf-8") as f:
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk) + "\n")
+        with open(path / "meta.json", "w") as f:
+            json.dump({"kind": self.kind, "count": len(self.chunks)}, f)
+
+    @classmethod
+    def load(cls, path=VECTOR_INDEX_PATH, mmap=VECTOR_INDEX_MMAP):
+        faiss = _faiss()
+        path = Path(path)
+        index_file = str(path / INDEX_FILE)
+        index = None
+        if mmap:
+            try:
+                index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError as e:
+                logger.warning(f"Memory-mapped load not supported for this index, reading normally: {e}")
+        if index is None:
+            index = faiss.read_index(index_file)
+        with open(path / CHUNKS_FILE, encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f]
+        with open(path / "meta.json") as f:
+            kind = json.load(f).get("kind", "flat")
+        return cls(index, chunks, kind)
+
+    def search(self, query_vectors, k=5, nprobe=VECTOR_INDEX_NPROBE, ef_search=VECTOR_INDEX_EF_SEARCH):
+        """Return the top-k chunks for each query vector as a list of hit lists."""
+        faiss = _faiss()
+        queries = _normalize(query_vectors)
+        k = max(1, min(k, len(self.chunks)))
+        with self._lock:
+            # Search-time parameters live on the index object, so set and search together.
+            if self.kind == "ivf":
+                faiss.extract_index_ivf(self.index).nprobe = nprobe
+            elif self.kind == "hnsw":
+                self.index.hnsw.efSearch = max(ef_search, k)
+            scores, positions = self.index.search(queries, k)
+        results = []
+        for row_scores, row_positions in zip(scores, positions):
+            hits = []
+            for score, position in zip(row_scores, row_positions):
+                if position < 0:
+                    continue
+                hits.append({**self.chunks[position], "score": float(score)})
+            results.append(hits)
+        return results
+
+
+def build_from_chroma(collection, kind=VECTOR_INDEX_KIND, page_size=10000):
+    """Build an index from the embeddings already stored in a Chroma collection."""
+    embeddings, chunks, offset = [], [], 0
+    while True:
+        page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        for chunk_id, embedding, document, metadata in zip(
+                page["ids"], page["embeddings"], page["documents"], page["metadatas"]):
+            embeddings.append(embedding)
+            chunks.append({"id": chunk_id, "text": document, **(metadata or {})})
+        if len(page["ids"]) < page_size:
+            break
+        offset += page_size
+    if not chunks:
+        raise ValueError("The Chroma collection is empty; run context ingestion first.")
+    return VectorIndex.build(np.asarray(embeddings, dtype=np.float32), chunks, kind=kind)
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_default_index():
+    """Load the index at VECTOR_INDEX_PATH once and reuse it; raises FileNotFoundError if not built."""
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                if not (Path(VECTOR_INDEX_PATH) / INDEX_FILE).exists():
+                    raise FileNotFoundError(f"No vector index found at {VECTOR_INDEX_PATH}.")
+                _default_index = VectorIndex.load(VECTOR_INDEX_PATH)
+    return _default_index
+
+
+def query_context(queries, k=5, nprobe=VECTOR_INDEX_NPROBE, ef_search=VECTOR_INDEX_EF_SEARCH):
+    """Embed one or more query strings and return top-k context chunks for each."""
+    from modules.context_ingestion import embed_texts
+    index = get_default_index()
+    return index.search(np.asarray(embed_texts(list(queries))), k=k, nprobe=nprobe, ef_search=ef_search)
+
+
+if __name__ == "__main__":
+    from modules.context_ingestion import CHROMA_COLLECTION, CHROMA_PATH, get_chroma_client
+
+    parser = argparse.ArgumentParser(description="Build the local FAISS index from the Chroma context collection.")
+    parser.add_argument("--kind", default=VECTOR_INDEX_KIND, choices=["flat", "ivf", "hnsw"])
+    parser.add_argument("--output", default=VECTOR_INDEX_PATH)
+    parser.add_argument("--collection", default=CHROMA_COLLECTION)
+    parser.add_argument("--chroma-path", default=CHROMA_PATH)
+    args = parser.parse_args()
+    collection = get_chroma_client(path=args.chroma_path).get_collection(args.collection)
+    build_from_chroma(collection, kind=args.kind).save(args.output)
+    print(f"Vector index written to {args.output}")
@@ -0,0 +1,330 @@
+# worker_pool.py
+
+import importlib.util
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+MODULE_WORKERS = int(os.getenv("MODULE_WORKERS", str(min(4, os.cpu_count() or 1))))
+MODULE_WORKER_TIMEOUT = float(os.getenv("MODULE_WORKER_TIMEOUT", "300"))  # Seconds per call; 0 disables
+MODULE_WORKER_MEMORY_MB = int(os.getenv("MODULE_WORKER_MEMORY_MB", "0"))  # Address-space cap per worker; 0 disables
+MODULE_WORKER_MAX_CALLS = int(os.getenv("MODULE_WORKER_MAX_CALLS", "1000"))  # Recycle a worker after this many calls
+MODULE_WORKER_START_METHOD = os.getenv("MODULE_WORKER_START_METHOD", "spawn")
+OUTPUT_FLUSH_BYTES = 4096
+
+
+class WorkerCallError(Exception):
+    """Raised when a function fails inside a worker, or the worker itself dies."""
+
+    def __init__(self, message, details="", stdout="", stderr=""):
+        super().__init__(message)
+        self.details = details
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class WorkerTimeoutError(WorkerCallError):
+    """Raised when a call runs past its timeout; the worker is killed and replaced."""
+
+
+class _PipeWriter:
+    """File-like stdout/stderr replacement that forwards output to the parent line by line."""
+
+    def __init__(self, conn, call_id, stream):
+        self.conn = conn
+        self.call_id = call_id
+        self.stream = stream
+        self._buffer = []
+        self._size = 0
+
+    def write(self, text):
+        if not text:
+            return 0
+        self._buffer.append(text)
+        self._size += len(text)
+        if "\n" in text or self._size >= OUTPUT_FLUSH_BYTES:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            self.conn.send(("output", self.call_id, self.stream, "".join(self._buffer)))
+            self._buffer, self._size = [], 0
+
+    def isatty(self):
+        return False
+
+
+def _load_module(loaded, module_path):
+    """Import a module file once per worker, re-executing it only when the file changes."""
+    mtime = os.stat(module_path).st_mtime_ns
+    cached = loaded.get(module_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    module_dir = os.path.dirname(module_path)
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir)  # Let the module import its siblings
+    module_name = os.path.splitext(os.path.basename(module_path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    loaded[module_path] = (mtime, module)
+    return module
+
+
+def _worker_main(conn, memory_limit_mb):
+    """Worker process loop: run one call at a time with its own stdout/stderr capture."""
+    if memory_limit_mb:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    loaded = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message is None:
+            return
+        call_id, module_path, function_name, args, kwargs = message
+        stdout, stderr = _PipeWriter(conn, call_id, "stdout"), _PipeWriter(conn, call_id, "stderr")
+        sys.stdout, sys.stderr = stdout, stderr
+        try:
+            module = _load_module(loaded, module_path)
+            func = getattr(module, function_name, None)
+            if not callable(func):
+                raise AttributeError(f"Module '{module_path}' does not have a function named '{function_name}'.")
+            reply = ("result", call_id, True, func(*args, **kwargs), "")
+        except BaseException as e:
+            reply = ("result", call_id, False, f"{type(e).__name__}: {e}", traceback.format_exc())
+        finally:
+            stdout.flush()
+            stderr.flush()
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        try:
+            conn.send(reply)
+        except Exception as e:
+            conn.send(("result", call_id, False, f"Result of '{function_name}' could not be sent back: {e}", ""))
+        if not reply[2] and reply[3].startswith("MemoryError"):
+            return  # The heap may be in a bad state; let the pool start a fresh worker
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb),
+                                       name="module-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class WorkerPool:
+    """Pool of warm subprocesses that keep loaded modules resident between calls.
+
+    Each worker runs one call at a time, so stdout/stderr are captured per call and
+    forwarded to the caller as they are written. A call that runs past its timeout
+    gets its worker killed and replaced; ``memory_limit_mb`` caps each worker's
+    address space.
+    """
+
+    def __init__(self, size=MODULE_WORKERS, timeout=MODULE_WORKER_TIMEOUT, memory_limit_mb=MODULE_WORKER_MEMORY_MB,
+                 max_calls=MODULE_WORKER_MAX_CALLS, start_method=MODULE_WORKER_START_METHOD):
+        self.size = max(1, size)
+        self.timeout = timeout or None
+        self.memory_limit_mb = memory_limit_mb
+        self.max_calls = max_calls
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._slots = threading.Semaphore(self.size)
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._call_ids = 0
+        self._closed = False
+        self.timeouts = 0
+        self.crashes = 0
+
+    def _checkout(self):
+        # A slot is held for as long as a caller owns a worker, so at most ``size`` workers exist.
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            if self._closed:
+                raise RuntimeError("Worker pool is shut down.")
+            worker = _Worker(self._context, self.memory_limit_mb)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._workers += 1
+        return worker
+
+    def _checkin(self, worker, healthy=True):
+        worker.calls += 1
+        if healthy and not self._closed and worker.alive() and worker.calls < self.max_calls:
+            self._idle.put(worker)
+        else:
+            worker.stop(kill=not healthy)
+            with self._lock:
+                self._workers -= 1
+        self._slots.release()
+
+    def stream(self, module_path, function_name, args=(), kwargs=None, timeout=None):
+        """Run a function in a worker, yielding output events as they happen.
+
+        Yields ``{"stream": "stdout"|"stderr", "data": text}`` events and finally
+        ``{"result": value}``. Failures raise WorkerCallError or WorkerTimeoutError.
+        """
+        timeout = self.timeout if timeout is None else (timeout or None)
+        worker = self._checkout()
+        healthy = False
+        with self._lock:
+            self._call_ids += 1
+            call_id = self._call_ids
+        try:
+            worker.conn.send((call_id, os.path.abspath(module_path), function_name, tuple(args), kwargs or {}))
+            deadline = time.monotonic() + timeout if timeout else None
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not worker.conn.poll(remaining):
+                    with self._lock:
+                        self.timeouts += 1
+                    raise WorkerTimeoutError(f"'{function_name}' timed out after {timeout}s.")
+                try:
+                    message = worker.conn.recv()
+                except (EOFError, OSError):
+                    with self._lock:
+                        self.crashes += 1
+                    worker.process.join(timeout=1)
+                    raise WorkerCallError(
+                        f"Worker exited with code {worker.process.exitcode} while running '{function_name}'"
+                        f"{' (memory limit reached?)' if self.memory_limit_mb else ''}."
+                    )
+                kind, _, *payload = message
+                if kind == "output":
+                    yield {"stream": payload[0], "data": payload[1]}
+                    continue
+                ok, value, details = payload
+                healthy = ok or not value.startswith("MemoryError")  # Such workers exit after replying
+                if not ok:
+                    raise WorkerCallError(value, details)
+                yield {"result": value}
+                return
+        finally:
+            self._checkin(worker, healthy)
+
+    def call(self, module_path, function_name, args=(), kwargs=None, timeout=None, on_output=None):
+        """Run a function in a worker and return {"result", "stdout", "stderr", "seconds"}.
+
+        ``on_output(stream, text)`` is called as output arrives. Errors carry the output
+        captured so far in their ``stdout``/``stderr`` attributes.
+        """
+        started = time.perf_counter()
+        output = {"stdout": [], "stderr": []}
+        try:
+            for event in self.stream(module_path, function_name, args, kwargs, timeout):
+                if "result" in event:
+                    return {
+                        "result": event["result"],
+                        "stdout": "".join(output["stdout"]),
+                        "stderr": "".join(output["stderr"]),
+                        "seconds": time.perf_counter() - started,
+                    }
+                output[event["stream"]].append(event["data"])
+                if on_output is not None:
+                    on_output(event["stream"], event["data"])
+        except WorkerCallError as e:
+            e.stdout, e.stderr = "".join(output["stdout"]), "".join(output["stderr"])
+            raise
+
+    def map(self, module_path, function_name, inputs, timeout=None, parallelism=None):
+        """Run a function over many inputs across the pool, yielding results as they finish.
+
+        Each input is an args list, or a dict with "args" and/or "kwargs". Yields
+        ``{"index", "result", "stdout", "stderr"}`` or ``{"index", "error", ...}``.
+        """
+        inputs = list(inputs)
+        if not inputs:
+            return
+
+        def run(item):
+            if isinstance(item, dict):
+                return self.call(module_path, function_name, item.get("args", ()), item.get("kwargs"), timeout)
+            return self.call(module_path, function_name, item, None, timeout)
+
+        executor = ThreadPoolExecutor(max_workers=min(parallelism or self.size, self.size, len(inputs)),
+                                      thread_name_prefix="module-map")
+        try:
+            futures = {executor.submit(run, item): index for index, item in enumerate(inputs)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    yield {"index": index, **future.result()}
+                except WorkerCallError as e:
+                    yield {"index": index, "error": str(e), "details": e.details, "stdout": e.stdout, "stderr": e.stderr}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "workers": self._workers,
+                "idle": self._idle.qsize(),
+                "timeouts": self.timeouts,
+                "crashes": self.crashes,
+            }
+
+    def shutdown(self):
+        """Stop idle workers; busy ones are stopped when their call returns."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            with self._lock:
+                self._workers -= 1
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """Return the process-wide worker pool, creating it on first use."""
+    global _default_pool
+    if _default_pool is None:
+        with _default_lock:
+            if _default_pool is None:
+                _default_pool = WorkerPool()
+    return _default_pool
@@ -1,5 +1,6 @@
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+import argparse
 import os
 import subprocess
 import time
@@ -19,15 +20,29 @@ class ReloadHandler(FileSystemEventHandler):
         if event.src_path.endswith("main.py"):
             self.start_script()
 
+def run_in_process():
+    """Serve main.py with in-process hot reload: changed DSPy modules are swapped without a restart."""
+    os.environ["HOT_RELOAD"] = "true"
+    from main import app
+    app.run(host='0.0.0.0', port=8080, use_reloader=False)
+
 if __name__ == "__main__":
-    script = "main.py"
-    event_handler = ReloadHandler(script)
-    observer = Observer()
-    observer.schedule(event_handler, path=".", recursive=False)
-    observer.start()
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+    parser = argparse.ArgumentParser(description="Run main.py and reload it on changes.")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Reload changed DSPy modules inside the running server instead of restarting it.")
+    args = parser.parse_args()
+
+    if args.in_process:
+        run_in_process()
+    else:
+        script = "main.py"
+        event_handler = ReloadHandler(script)
+        observer = Observer()
+        observer.schedule(event_handler, path=".", recursive=False)
+        observer.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            observer.stop()
+        observer.join()